@@ -0,0 +1,91 @@
+import numpy as np
+from scipy import sparse
+
+from .search_index import KeywordIndex, ngrams
+
+
+class BatchScorer:
+    """
+    Scores many queries against every condition with one sparse matrix product.
+    Rows of the keyword matrix are the keywords of a KeywordIndex and columns
+    are condition ids, so scores match KeywordIndex.best_keyword_match.
+    """
+
+    def __init__(self, index: KeywordIndex, size: int):
+        self.index = index
+        self.size = size
+        self.vocabulary = {key: row for row, key in enumerate(index.keyword_postings)}
+
+        rows = []
+        cols = []
+        for key, entry_ids in index.keyword_postings.items():
+            rows.extend([self.vocabulary[key]] * len(entry_ids))
+            cols.extend(entry_ids)
+        # Repeated (keyword, condition) pairs are summed, as in the index
+        self.matrix = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.int32), (rows, cols)),
+            shape=(len(self.vocabulary), size),
+        )
+
+    def query_matrix(self, token_lists: list):
+        rows = []
+        cols = []
+        for row, tokens in enumerate(token_lists):
+            for gram in ngrams(tokens, self.index.max_keyword_len):
+                col = self.vocabulary.get(gram)
+                if col is not None:
+                    rows.append(row)
+                    cols.append(col)
+        return sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.int32), (rows, cols)),
+            shape=(len(token_lists), len(self.vocabulary)),
+        )
+
+    def best_keyword_matches(self, token_lists: list):
+        """
+        Returns (entry_ids, scores) arrays with one slot per query.
+        Queries without any keyword hit get id -1 and score 0.
+        Ties go to the earliest entry.
+        """
+        scores = self.query_matrix(token_lists) @ self.matrix
+        scores.sort_indices()
+
+        best_ids = np.full(len(token_lists), -1, dtype=np.int64)
+        best_scores = np.zeros(len(token_lists), dtype=np.int64)
+        counts = np.diff(scores.indptr)
+        hit_rows = np.flatnonzero(counts)
+        if not len(hit_rows):
+            return best_ids, best_scores
+
+        row_max = np.maximum.reduceat(scores.data, scores.indptr[hit_rows])
+        # With sorted indices, the first maximum in each row is the lowest condition id
+        row_of = np.repeat(np.arange(len(token_lists)), counts)
+        is_max = scores.data == np.repeat(row_max, counts[hit_rows])
+        max_rows, first = np.unique(row_of[is_max], return_index=True)
+        best_ids[max_rows] = scores.indices[np.flatnonzero(is_max)[first]]
+        best_scores[max_rows] = row_max
+        return best_ids, best_scores
+
+
+class LayeredBatchScorer:
+    """
+    A BatchScorer over a frozen base plus the keyword index of the entries
+    appended since, which are few enough to score one query at a time.
+    """
+
+    def __init__(self, base: BatchScorer, delta: KeywordIndex, size: int):
+        self.base = base
+        self.delta = delta
+        self.size = size
+
+    def best_keyword_matches(self, token_lists: list):
+        best_ids, best_scores = self.base.best_keyword_matches(token_lists)
+        if not self.delta.keyword_postings:
+            return best_ids, best_scores
+        for row, tokens in enumerate(token_lists):
+            entry_id, score = self.delta.best_keyword_match(tokens)
+            # Appended entries have higher ids, so they only win outright
+            if score > best_scores[row]:
+                best_ids[row] = entry_id
+                best_scores[row] = score
+        return best_ids, best_scores
@@ -0,0 +1,3 @@
+"""
+Benchmarks for the backend. Run each module with python -m from the repo root.
+"""
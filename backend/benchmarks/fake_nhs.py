@@ -0,0 +1,151 @@
+"""
+Local stand-in for the NHS conditions site, with configurable latency,
+404 rate and hanging requests. Serves an A-Z index at /conditions/ and a
+page for any /conditions/<slug>/, so both the live web bridge and
+build_dataset can run against it.
+
+    python -m backend.benchmarks.fake_nhs --port 8765 --latency-ms 200 --not-found-rate 0.3
+    NHS_BASE_URL=http://127.0.0.1:8765/conditions/ uvicorn backend.main:app
+"""
+import argparse
+import hashlib
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+INDEX_SIZE = 50  # Conditions listed on the A-Z index page
+
+
+class FakeNHSConfig:
+    def __init__(self, latency_ms: float = 100, jitter_ms: float = 50, not_found_rate: float = 0.2,
+                 timeout_rate: float = 0.0, hang_seconds: float = 10.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.not_found_rate = not_found_rate
+        self.timeout_rate = timeout_rate
+        self.hang_seconds = hang_seconds
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "pages": 0, "not_found": 0, "not_modified": 0, "timeouts": 0}
+
+    def count(self, key: str):
+        with self.lock:
+            self.stats[key] += 1
+
+    def roll(self) -> float:
+        with self.lock:
+            return self.rng.random()
+
+    def delay(self) -> float:
+        with self.lock:
+            jitter = self.rng.uniform(-self.jitter_ms, self.jitter_ms)
+        return max(0.0, self.latency_ms + jitter) / 1000
+
+    def is_missing(self, slug: str) -> bool:
+        """
+        The same slug is always missing or always present, like a real site.
+        """
+        digest = int(hashlib.md5(slug.encode("utf-8")).hexdigest()[:8], 16)
+        return digest / 0xFFFFFFFF < self.not_found_rate
+
+
+def condition_page(slug: str) -> bytes:
+    title = slug.replace("-", " ").capitalize()
+    return (
+        "<html><body><main>"
+        f"<h1>{title}</h1>"
+        "<section class=\"nhsuk-section\">"
+        f"<p>{title} is a condition that usually causes discomfort, tiredness and other symptoms "
+        "that come and go over several weeks.</p>"
+        f"<p>See a GP if symptoms of {title.lower()} do not improve, or get worse after a few days.</p>"
+        "</section></main></body></html>"
+    ).encode("utf-8")
+
+
+def index_page() -> bytes:
+    links = "".join(
+        f"<li><a href=\"/conditions/condition-{i}/\">Condition {i}</a></li>" for i in range(INDEX_SIZE)
+    )
+    return f"<html><body><main><ul>{links}</ul></main></body></html>".encode("utf-8")
+
+
+def make_handler(config: FakeNHSConfig):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            config.count("requests")
+            if config.roll() < config.timeout_rate:
+                config.count("timeouts")
+                time.sleep(config.hang_seconds)  # Longer than the client timeout
+                return self._send(504, b"")
+            time.sleep(config.delay())
+
+            path = self.path.split("?")[0].strip("/")
+            if path == "conditions":
+                return self._send(200, index_page())
+            parts = path.split("/")
+            if len(parts) != 2 or parts[0] != "conditions" or config.is_missing(parts[1]):
+                config.count("not_found")
+                return self._send(404, b"<html><body>Page not found</body></html>")
+
+            body = condition_page(parts[1])
+            etag = '"' + hashlib.md5(body).hexdigest() + '"'
+            if self.headers.get("If-None-Match") == etag:
+                config.count("not_modified")
+                return self._send(304, b"")
+            config.count("pages")
+            self._send(200, body, {"ETag": etag})
+
+        def _send(self, status: int, body: bytes, headers: dict = None):
+            try:
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # The client gave up waiting
+
+    return Handler
+
+
+def start_fake_nhs(config: FakeNHSConfig, host: str = "127.0.0.1", port: int = 0):
+    """
+    Serves the fake site from a background thread.
+    Returns (server, base_url); call server.shutdown() to stop it.
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(config))
+    server.daemon_threads = True  # Hanging requests must not block shutdown
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/conditions/"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the NHS conditions site.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=100)
+    parser.add_argument("--jitter-ms", type=float, default=50)
+    parser.add_argument("--not-found-rate", type=float, default=0.2)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--hang-seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    config = FakeNHSConfig(args.latency_ms, args.jitter_ms, args.not_found_rate,
+                           args.timeout_rate, args.hang_seconds)
+    server, base_url = start_fake_nhs(config, port=args.port)
+    print(f"Fake NHS site at {base_url}")
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(config.stats)
+
+
+if __name__ == "__main__":
+    main()
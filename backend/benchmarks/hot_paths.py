@@ -0,0 +1,226 @@
+"""
+Micro-benchmarks for the matching and extraction hot paths, on synthetic
+knowledge bases of increasing size. Runs offline: the live web bridge is
+stubbed to always miss.
+
+    python -m backend.benchmarks.hot_paths --save        # record a baseline
+    python -m backend.benchmarks.hot_paths               # compare against it
+
+Each benchmark reports throughput, p50/p99 latency and the peak Python
+heap (tracemalloc) during a separate, untimed pass. Compared with a saved
+baseline, a p50 or peak memory increase above the thresholds fails the run.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+
+from .. import knowledge_base, main, pdf_processor, web_bridge
+from ..risk_engine import calculate_risk_score
+from . import synthetic
+
+SIZES = (1_000, 10_000, 100_000)
+QUERY_COUNT = 2_000
+REPORT_PAGES = 20
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "baseline.json")
+LATENCY_THRESHOLD = 0.25  # Fail if p50 grows by more than this fraction
+MEMORY_THRESHOLD = 0.25
+# Differences below these are noise, whatever the ratio
+MIN_LATENCY_DELTA_MS = 0.05
+MIN_MEMORY_DELTA_KB = 64
+
+
+class PdfUpload:
+    """
+    Just enough of UploadFile for pdf_processor.
+    """
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.file = io.BytesIO(data)
+
+    async def read(self, size: int = -1) -> bytes:
+        return self.file.read(size)
+
+
+def stub_web_bridge():
+    async def no_result_async(query, *args, **kwargs):
+        return None
+
+    web_bridge.get_live_nhs_data_async = no_result_async
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def measure(fn, inputs: list, memory_sample: int = 50) -> dict:
+    """
+    Calls fn once per input and summarizes the latencies, then repeats the
+    first memory_sample inputs under tracemalloc for the peak heap size.
+    """
+    fn(inputs[0])  # Warm-up: lazy imports, lazily built indexes, pools
+    latencies = []
+    with redirect_stdout(io.StringIO()) as sink:
+        started = time.perf_counter()
+        for value in inputs:
+            start = time.perf_counter()
+            fn(value)
+            latencies.append(time.perf_counter() - start)
+            sink.seek(0)
+            sink.truncate()
+        total = time.perf_counter() - started
+
+        tracemalloc.start()
+        for value in inputs[:memory_sample]:
+            fn(value)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "calls": len(inputs),
+        "throughput": round(len(inputs) / total, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 4),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 4),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def run_benchmarks(sizes, query_count: int, only: str = None) -> dict:
+    stub_web_bridge()
+    results = {}
+    loop = asyncio.new_event_loop()
+
+    def run(name, fn, inputs, **kwargs):
+        if only and only not in name:
+            return
+        results[name] = measure(fn, inputs, **kwargs)
+        print_row(name, results[name])
+
+    def find_best_match(query):
+        return loop.run_until_complete(main.find_best_match_async(query))
+
+    try:
+        for size in sizes:
+            entries = synthetic.make_knowledge_base(size, seed=size)
+            run(f"build_snapshot[kb={size}]", knowledge_base.build_snapshot, [entries] * 3, memory_sample=1)
+            snapshot = knowledge_base.build_snapshot(entries)
+            knowledge_base._publish(snapshot)
+
+            queries = synthetic.make_queries(entries, query_count, seed=1)
+            misspelled = synthetic.make_misspelled_queries(entries, query_count, seed=2)
+            reports = ["\n".join(synthetic.make_report_text(entries, REPORT_PAGES, seed=i)) for i in range(20)]
+
+            run(f"find_best_match_async[kb={size},queries=realistic]", find_best_match, queries)
+            run(f"find_best_match_async[kb={size},queries=misspelled]", find_best_match, misspelled)
+            run(f"find_condition_in_text[kb={size},pages={REPORT_PAGES}]", main.find_condition_in_text, reports)
+
+        # The rest do not depend on the knowledge base size
+        entries = synthetic.make_knowledge_base(min(sizes), seed=0)
+        queries = synthetic.make_queries(entries, query_count, seed=3)
+        pairs = [(query, entries[i % len(entries)]) for i, query in enumerate(queries)]
+        run("generate_dynamic_response", lambda pair: main.generate_dynamic_response(pair[0], pair[1], "text"), pairs)
+
+        scores = [((i % 100) / 100, (i * 7 % 100) / 100, (i * 13 % 100) / 100) for i in range(query_count)]
+        run("calculate_risk_score", lambda args: calculate_risk_score(*args), scores)
+
+        if not only or "extract_text_from_pdf" in only:
+            try:
+                pdfs = [synthetic.make_report_pdf(entries, REPORT_PAGES, seed=i) for i in range(5)] * 4
+                run(
+                    f"extract_text_from_pdf[pages={REPORT_PAGES}]",
+                    lambda data: loop.run_until_complete(pdf_processor.extract_text_from_pdf(PdfUpload(data))),
+                    pdfs,
+                    memory_sample=5,
+                )
+            finally:
+                pdf_processor.shutdown_pool()
+    finally:
+        loop.close()
+
+    return results
+
+
+def print_row(name: str, result: dict, baseline: dict = None):
+    change = ""
+    if baseline:
+        change = f"{(result['p50_ms'] / baseline['p50_ms'] - 1) * 100:+7.1f}%" if baseline["p50_ms"] else ""
+    print(f"{name:<58} {result['throughput']:>10} {result['p50_ms']:>9} "
+          f"{result['p99_ms']:>9} {result['peak_kb']:>9} {change}")
+
+
+def find_regressions(results: dict, baseline: dict, latency_threshold: float,
+                     memory_threshold: float) -> list:
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if (result["p50_ms"] > before["p50_ms"] * (1 + latency_threshold)
+                and result["p50_ms"] - before["p50_ms"] > MIN_LATENCY_DELTA_MS):
+            regressions.append(f"{name}: p50 {before['p50_ms']} ms -> {result['p50_ms']} ms")
+        if (result["peak_kb"] > before["peak_kb"] * (1 + memory_threshold)
+                and result["peak_kb"] - before["peak_kb"] > MIN_MEMORY_DELTA_KB):
+            regressions.append(f"{name}: peak memory {before['peak_kb']} KB -> {result['peak_kb']} KB")
+    return regressions
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark the matching and extraction hot paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES),
+                        help="synthetic knowledge base sizes")
+    parser.add_argument("--queries", type=int, default=QUERY_COUNT, help="queries per benchmark")
+    parser.add_argument("--only", help="run only benchmarks whose name contains this")
+    parser.add_argument("--ranking", choices=("keywords", "bm25"), default=main.RANKING_MODE)
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline JSON file")
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=LATENCY_THRESHOLD,
+                        help="allowed fractional p50 increase over the baseline")
+    parser.add_argument("--memory-threshold", type=float, default=MEMORY_THRESHOLD,
+                        help="allowed fractional peak memory increase over the baseline")
+    args = parser.parse_args()
+    main.RANKING_MODE = args.ranking
+
+    print(f"{'benchmark':<58} {'ops/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'peak KB':>9}")
+    results = run_benchmarks(args.sizes, args.queries, args.only)
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "ranking": args.ranking,
+                "results": results,
+            }, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save to create one.")
+        return
+
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)["results"]
+    print("\nChange in p50 against the baseline:")
+    for name, result in results.items():
+        if name in baseline:
+            print_row(name, result, baseline[name])
+
+    regressions = find_regressions(results, baseline, args.threshold, args.memory_threshold)
+    if regressions:
+        print("\nRegressions:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("\nNo regressions.")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,156 @@
+"""
+Compares full-resolution decoding of uploaded photos with the reduced
+decode path in image_processor.decode_image.
+
+    python -m backend.benchmarks.image_decode
+
+Each case runs in a fresh interpreter so peak RSS is measured in isolation.
+Only the PIL stages are timed (decode, resize to 256, crop to 224); torch
+is not needed.
+"""
+import argparse
+import io
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from ..image_processor import RESIZE_TO, decode_image
+
+# (label, width, height, format) for typical phone and camera uploads
+CASES = (
+    ("2MP JPEG", 1600, 1200, "JPEG"),
+    ("8MP JPEG", 3264, 2448, "JPEG"),
+    ("12MP JPEG", 4032, 3024, "JPEG"),
+    ("24MP JPEG", 6000, 4000, "JPEG"),
+    ("12MP PNG", 4032, 3024, "PNG"),
+)
+CROP = 224
+
+
+def make_image(path: str, width: int, height: int, image_format: str):
+    """
+    Writes a photo-like test image: a smooth gradient with sensor-style noise.
+    """
+    from PIL import Image
+
+    gradient = Image.radial_gradient("L").resize((width, height))
+    noise = Image.effect_noise((width, height), 24)
+    image = Image.merge("RGB", (gradient, noise, Image.blend(gradient, noise, 0.5)))
+    image.save(path, format=image_format, quality=90)
+
+
+def finish(image):
+    """
+    Resize and center crop as torchvision's Resize(256) + CenterCrop(224) would.
+    """
+    from PIL import Image
+
+    width, height = image.size
+    scale = RESIZE_TO / min(width, height)
+    image = image.resize((round(width * scale), round(height * scale)), Image.BILINEAR)
+    left = (image.width - CROP) // 2
+    top = (image.height - CROP) // 2
+    return image.crop((left, top, left + CROP, top + CROP))
+
+
+def decode_full(path: str):
+    """
+    The previous path: read the upload into bytes, wrap it, decode everything.
+    """
+    from PIL import Image
+
+    with open(path, "rb") as f:
+        contents = f.read()
+    return finish(Image.open(io.BytesIO(contents)).convert("RGB"))
+
+
+def decode_reduced(path: str):
+    with open(path, "rb") as f:
+        return finish(decode_image(f))
+
+
+def _rss_kb(field: str) -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    raise KeyError(field)
+
+
+def reset_peak_rss() -> int:
+    """
+    Resets the peak RSS counter where the kernel allows it (Linux) and
+    returns the baseline to measure the next peak against, in KB.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return _rss_kb("VmRSS")
+    except OSError:
+        # The peak cannot be reset, so earlier peaks (imports) may hide this one
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def peak_rss() -> int:
+    try:
+        return _rss_kb("VmHWM")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_case(path: str, mode: str, repeat: int) -> dict:
+    """
+    Runs in a child interpreter. The first run measures the peak RSS
+    increase; the rest are timed.
+    """
+    import PIL.Image  # Import before the RSS baseline  # pylint: disable=unused-import
+
+    decode = decode_full if mode == "full" else decode_reduced
+    baseline = reset_peak_rss()
+    decode(path)
+    peak_kb = peak_rss() - baseline
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        decode(path)
+        timings.append(time.perf_counter() - start)
+    return {"peak_mb": round(peak_kb / 1024, 1), "median_ms": round(statistics.median(timings) * 1000, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark full vs reduced image decoding.")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case")
+    parser.add_argument("--case", nargs=2, metavar=("PATH", "MODE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(args.case[0], args.case[1], args.repeat)))
+        return
+
+    print(f"{'upload':<11} {'size (MB)':>9} {'full ms':>8} {'full MB':>8} {'reduced ms':>10} {'reduced MB':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, width, height, image_format in CASES:
+            path = os.path.join(tmp, f"{width}x{height}.{image_format.lower()}")
+            make_image(path, width, height, image_format)
+            results = {}
+            for mode in ("full", "reduced"):
+                out = subprocess.run(
+                    [sys.executable, "-m", "backend.benchmarks.image_decode",
+                     "--case", path, mode, "--repeat", str(args.repeat)],
+                    capture_output=True, text=True, check=True,
+                )
+                results[mode] = json.loads(out.stdout.strip().splitlines()[-1])
+            size_mb = os.path.getsize(path) / 1024 / 1024
+            print(f"{label:<11} {size_mb:>9.1f} "
+                  f"{results['full']['median_ms']:>8} {results['full']['peak_mb']:>8} "
+                  f"{results['reduced']['median_ms']:>10} {results['reduced']['peak_mb']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+"""
+End-to-end load test: starts the API under uvicorn against a local fake
+NHS site, drives mixed image/symptom/report traffic and reports latency,
+errors and throughput per endpoint.
+
+    python -m backend.benchmarks.load_test --rps 20 --duration 30
+    python -m backend.benchmarks.load_test --concurrency 50 --not-found-rate 0.5 --timeout-rate 0.05
+
+The app runs in a scratch directory with a copy of medical_data.json, so
+conditions learned during the run never touch the real knowledge base.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from . import synthetic
+from .fake_nhs import FakeNHSConfig, start_fake_nhs
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+MEDICAL_DATA_FILE = os.path.join(REPO_ROOT, "medical_data.json")
+ENDPOINTS = {
+    "symptoms": "/analyze-symptoms",
+    "image": "/analyze-image",
+    "report": "/analyze-report",
+}
+DEFAULT_MIX = "symptoms=3,image=1,report=1"
+UNKNOWN_RATE = 0.2  # Share of inputs naming no known condition, which go to the web
+REQUEST_TIMEOUT = 60
+STARTUP_TIMEOUT = 30
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def parse_mix(mix: str) -> dict:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint {name!r}; expected one of {', '.join(ENDPOINTS)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+class TrafficGenerator:
+    """
+    Builds request payloads from the real knowledge base, plus made-up
+    condition names that miss locally and fall through to the web bridge.
+    """
+
+    def __init__(self, entries: list, mix: dict, unknown_rate: float, seed: int = 0):
+        self.rng = random.Random(seed)
+        self.entries = entries
+        self.kinds = list(mix)
+        self.weights = [mix[kind] for kind in self.kinds]
+        self.unknown_rate = unknown_rate
+        self.image = self._make_image()
+        self.reports = [synthetic.make_report_pdf(entries, 6, seed=i) for i in range(5)]
+
+    @staticmethod
+    def _make_image() -> bytes:
+        try:
+            from PIL import Image
+        except ImportError:
+            return b"\xff\xd8\xff\xd9"  # Not decodable, but filename matching still runs
+        buffer = io.BytesIO()
+        Image.new("RGB", (640, 480), (200, 150, 120)).save(buffer, format="JPEG")
+        return buffer.getvalue()
+
+    def _unknown_name(self) -> str:
+        # Rare letters keep the fuzzy fallback from matching a real condition
+        return "".join(self.rng.choice("qxzjkvw") + self.rng.choice("uy") for _ in range(4))
+
+    def _name(self) -> str:
+        if self.rng.random() < self.unknown_rate:
+            return self._unknown_name()
+        return self.rng.choice(self.entries)["condition"].lower()
+
+    def next_request(self):
+        kind = self.rng.choices(self.kinds, self.weights)[0]
+        if kind == "symptoms":
+            entry = self.rng.choice(self.entries)
+            words = self.rng.sample(entry["keywords"], min(2, len(entry["keywords"])))
+            if self.rng.random() < self.unknown_rate:
+                words = [self._unknown_name()]
+            return kind, {"params": {"symptoms": " ".join(words)}}
+        if kind == "image":
+            filename = self._name().replace(" ", "_") + ".jpg"
+            return kind, {"files": {"file": (filename, self.image, "image/jpeg")}}
+        filename = self._name().replace(" ", "_") + ".pdf"
+        return kind, {"files": {"file": (filename, self.rng.choice(self.reports), "application/pdf")}}
+
+
+class Results:
+    def __init__(self):
+        self.latencies = {kind: [] for kind in ENDPOINTS}
+        self.errors = {kind: 0 for kind in ENDPOINTS}
+        self.dropped = 0  # Open-loop arrivals skipped because too many were in flight
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def record(self, kind: str, seconds: float, ok: bool):
+        self.latencies[kind].append(seconds)
+        if not ok:
+            self.errors[kind] += 1
+
+    def summary(self) -> dict:
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        summary = {}
+        for kind, latencies in self.latencies.items():
+            if not latencies:
+                continue
+            latencies = sorted(latencies)
+
+            def pct(fraction):
+                return round(latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] * 1000, 1)
+
+            summary[kind] = {
+                "requests": len(latencies),
+                "error_rate": round(self.errors[kind] / len(latencies), 4),
+                "throughput": round(len(latencies) / elapsed, 2),
+                "p50_ms": pct(0.50),
+                "p90_ms": pct(0.90),
+                "p99_ms": pct(0.99),
+                "max_ms": round(latencies[-1] * 1000, 1),
+            }
+        total = sum(len(latencies) for latencies in self.latencies.values())
+        summary["total"] = {
+            "requests": total,
+            "error_rate": round(sum(self.errors.values()) / total, 4) if total else 0.0,
+            "throughput": round(total / elapsed, 2),
+            "dropped": self.dropped,
+            "seconds": round(elapsed, 1),
+        }
+        return summary
+
+
+async def send(client: httpx.AsyncClient, traffic: TrafficGenerator, results: Results):
+    kind, request = traffic.next_request()
+    start = time.perf_counter()
+    try:
+        response = await client.post(ENDPOINTS[kind], **request)
+        ok = response.status_code < 400
+    except httpx.HTTPError:
+        ok = False
+    results.record(kind, time.perf_counter() - start, ok)
+
+
+async def run_open_loop(client, traffic, results, rps: float, duration: float, max_in_flight: int):
+    """
+    Starts requests at a fixed rate regardless of how fast they complete.
+    """
+    loop = asyncio.get_running_loop()
+    in_flight = set()
+    start = loop.time()
+    sent = 0
+    while loop.time() - start < duration:
+        wait = start + sent / rps - loop.time()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        sent += 1
+        if len(in_flight) >= max_in_flight:
+            results.dropped += 1
+            continue
+        task = asyncio.create_task(send(client, traffic, results))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+    await asyncio.gather(*in_flight)
+
+
+async def run_closed_loop(client, traffic, results, concurrency: int, duration: float):
+    """
+    Keeps exactly `concurrency` requests in flight.
+    """
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            await send(client, traffic, results)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+def start_app(workdir: str, port: int, nhs_base_url: str, log):
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": REPO_ROOT + os.pathsep + env.get("PYTHONPATH", ""),
+        "NHS_BASE_URL": nhs_base_url,
+    })
+    env.pop("NHS_CACHE_PATH", None)  # Every run starts with a cold web cache
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+
+
+async def wait_until_ready(base_url: str, app) -> None:
+    deadline = time.perf_counter() + STARTUP_TIMEOUT
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.perf_counter() < deadline:
+            if app.poll() is not None:
+                raise RuntimeError("API process exited during startup")
+            try:
+                if (await client.get("/")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"API did not start within {STARTUP_TIMEOUT}s")
+
+
+def blocked_loop_counts(metrics_text: str) -> dict:
+    counts = {}
+    for line in metrics_text.splitlines():
+        if line.startswith("rural_ai_event_loop_blocked_total"):
+            name, value = line.rsplit(" ", 1)
+            counts[name.split('endpoint="')[-1].rstrip('"}')] = int(float(value))
+    return counts
+
+
+async def run_load_test(args) -> dict:
+    with open(args.data, "r") as f:
+        entries = json.load(f)
+    traffic = TrafficGenerator(entries, parse_mix(args.mix), args.unknown_rate, args.seed)
+
+    config = FakeNHSConfig(args.latency_ms, args.jitter_ms, args.not_found_rate,
+                           args.timeout_rate, args.hang_seconds, args.seed)
+    server, nhs_base_url = start_fake_nhs(config)
+    workdir = tempfile.mkdtemp(prefix="rural-ai-load-")
+    shutil.copy(args.data, os.path.join(workdir, "medical_data.json"))
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+
+    with open(os.path.join(workdir, "app.log"), "w") as log:
+        app = start_app(workdir, port, nhs_base_url, log)
+        try:
+            await wait_until_ready(base_url, app)
+            limits = httpx.Limits(max_connections=None, max_keepalive_connections=100)
+            async with httpx.AsyncClient(base_url=base_url, timeout=REQUEST_TIMEOUT, limits=limits) as client:
+                results = Results()
+                if args.concurrency:
+                    await run_closed_loop(client, traffic, results, args.concurrency, args.duration)
+                else:
+                    await run_open_loop(client, traffic, results, args.rps, args.duration, args.max_in_flight)
+                results.finished = time.perf_counter()
+                metrics_text = (await client.get("/metrics")).text
+        finally:
+            app.terminate()
+            app.wait(timeout=10)
+            server.shutdown()
+
+    report = results.summary()
+    report["event_loop_blocked"] = blocked_loop_counts(metrics_text)
+    report["fake_nhs"] = dict(config.stats)
+    if args.keep:
+        report["workdir"] = workdir
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+def print_report(report: dict):
+    print(f"\n{'endpoint':<10} {'requests':>8} {'errors':>7} {'req/s':>7} "
+          f"{'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for kind in ENDPOINTS:
+        if kind in report:
+            row = report[kind]
+            print(f"{kind:<10} {row['requests']:>8} {row['error_rate']:>7.1%} {row['throughput']:>7} "
+                  f"{row['p50_ms']:>8} {row['p90_ms']:>8} {row['p99_ms']:>8} {row['max_ms']:>8}")
+    total = report["total"]
+    print(f"{'total':<10} {total['requests']:>8} {total['error_rate']:>7.1%} {total['throughput']:>7}"
+          f"   ({total['seconds']}s, {total['dropped']} arrivals dropped)")
+    print(f"\nEvent loop blocked (>100 ms) per endpoint: {report['event_loop_blocked'] or 'never'}")
+    print(f"Fake NHS site: {report['fake_nhs']}")
+    if "workdir" in report:
+        print(f"App log and knowledge base kept in {report['workdir']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the API against a fake NHS site.")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--rps", type=float, default=10.0, help="open-loop arrival rate")
+    load.add_argument("--concurrency", type=int, help="closed-loop: requests kept in flight")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of traffic")
+    parser.add_argument("--max-in-flight", type=int, default=500,
+                        help="open-loop arrivals beyond this many in flight are dropped")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="endpoint weights, e.g. symptoms=3,image=1,report=1")
+    parser.add_argument("--unknown-rate", type=float, default=UNKNOWN_RATE,
+                        help="share of inputs that miss locally and go to the web")
+    parser.add_argument("--latency-ms", type=float, default=100, help="fake NHS response latency")
+    parser.add_argument("--jitter-ms", type=float, default=50)
+    parser.add_argument("--not-found-rate", type=float, default=0.2, help="share of slugs that 404")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="share of requests that hang")
+    parser.add_argument("--hang-seconds", type=float, default=10.0)
+    parser.add_argument("--data", default=MEDICAL_DATA_FILE, help="knowledge base to serve")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch directory and app log")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load_test(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
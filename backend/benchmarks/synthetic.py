@@ -0,0 +1,128 @@
+"""
+Seeded generators for benchmark inputs: knowledge bases of any size,
+symptom query corpora (well-formed and misspelled) and multi-page PDF
+reports. The same seed always produces the same data.
+"""
+import random
+import string
+
+SYLLABLES = (
+    "ab", "ac", "al", "an", "ar", "ba", "be", "bi", "ca", "co", "da", "de", "di", "do",
+    "el", "em", "en", "er", "fa", "fi", "ga", "ge", "ha", "he", "id", "il", "in", "is",
+    "ka", "la", "le", "li", "lo", "ma", "me", "mi", "mo", "na", "ne", "ni", "no", "os",
+    "pa", "pe", "pi", "po", "ra", "re", "ri", "ro", "sa", "se", "si", "so", "ta", "te",
+    "ti", "to", "ul", "um", "ur", "va", "ve", "vi", "za", "zo",
+)
+SUFFIXES = ("itis", "osis", "emia", "algia", "oma", "pathy", " syndrome", " disease", " fever")
+FILLER = (
+    "i", "have", "had", "my", "since", "days", "the", "a", "and", "with", "some",
+    "feel", "feeling", "after", "eating", "at", "night", "for", "two", "weeks", "very",
+)
+REPORT_FILLER = (
+    "Patient was reviewed in clinic today. Observations were within normal limits. "
+    "Full blood count and renal function were requested. No known drug allergies. "
+    "Follow-up arranged with the community health worker in four weeks. "
+)
+
+
+def make_word(rng: random.Random, min_syllables: int = 2, max_syllables: int = 4) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(min_syllables, max_syllables)))
+
+
+def make_knowledge_base(size: int, seed: int = 0) -> list:
+    """
+    Returns size entries shaped like medical_data.json, with unique names.
+    """
+    rng = random.Random(seed)
+    vocabulary = list({make_word(rng) for _ in range(max(500, size // 4))})
+    vocabulary.sort()
+    entries = []
+    names = set()
+    while len(entries) < size:
+        name = (make_word(rng, 2, 3) + rng.choice(SUFFIXES)).capitalize()
+        if rng.random() < 0.3:
+            name = f"{make_word(rng, 1, 2).capitalize()} {name.lower()}"
+        if name in names:
+            continue
+        names.add(name)
+        keywords = rng.sample(vocabulary, 5)
+        entries.append({
+            "condition": name,
+            "keywords": keywords,
+            "stage": "Clinical Presentation",
+            "explanation": f"{name} presents with {', '.join(keywords[:3])} and is {' '.join(rng.sample(vocabulary, 8))}.",
+            "treatment_guidance": "Please consult a healthcare professional.",
+            "medications": ["Consult Doctor"],
+            "dos": ["Monitor symptoms"],
+            "donts": ["Do not self-medicate without advice"],
+            "referral": "Refer to GP if symptoms persist.",
+        })
+    return entries
+
+
+def make_queries(entries: list, count: int, seed: int = 0) -> list:
+    """
+    Symptom descriptions built from an entry's keywords plus everyday filler words.
+    """
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        entry = rng.choice(entries)
+        words = rng.sample(entry["keywords"], rng.randint(1, 3)) + rng.sample(FILLER, rng.randint(2, 6))
+        rng.shuffle(words)
+        queries.append(" ".join(words))
+    return queries
+
+
+def misspell(word: str, rng: random.Random) -> str:
+    if len(word) < 4:
+        return word
+    i = rng.randrange(1, len(word) - 1)
+    edit = rng.choice(("drop", "swap", "replace", "double"))
+    if edit == "drop":
+        return word[:i] + word[i + 1:]
+    if edit == "swap":
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    if edit == "replace":
+        return word[:i] + rng.choice(string.ascii_lowercase) + word[i + 1:]
+    return word[:i] + word[i] + word[i:]
+
+
+def make_misspelled_queries(entries: list, count: int, seed: int = 0) -> list:
+    """
+    Condition names with one typo, as typed by someone who half-remembers them.
+    These miss the exact-name and keyword paths and exercise the fuzzy fallback.
+    """
+    rng = random.Random(seed)
+    return [misspell(rng.choice(entries)["condition"].lower(), rng) for _ in range(count)]
+
+
+def make_report_text(entries: list, pages: int, seed: int = 0) -> list:
+    """
+    Returns one text block per page. One condition is mentioned on a few
+    pages, with a couple of others mentioned in passing.
+    """
+    rng = random.Random(seed)
+    main = rng.choice(entries)["condition"]
+    others = [entry["condition"] for entry in rng.sample(entries, min(3, len(entries)))]
+    texts = []
+    for page in range(pages):
+        paragraphs = [REPORT_FILLER * 3]
+        if page % 4 == 1:
+            paragraphs.append(f"Findings are consistent with {main}.")
+        if page % 7 == 3:
+            paragraphs.append(f"History of {rng.choice(others)} noted.")
+        texts.append("\n\n".join(paragraphs))
+    return texts
+
+
+def make_report_pdf(entries: list, pages: int, seed: int = 0) -> bytes:
+    import fitz  # PyMuPDF
+
+    doc = fitz.open()
+    for text in make_report_text(entries, pages, seed):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(50, 50, 545, 792), text, fontsize=10)
+    data = doc.tobytes()
+    doc.close()
+    return data
@@ -1,132 +1,299 @@
-import requests
-from bs4 import BeautifulSoup
+import argparse
+import asyncio
 import json
+import os
 import time
-import random
 from typing import List, Dict, Any, Optional
+from urllib.parse import urljoin, urlparse
+
+import httpx
+from bs4 import BeautifulSoup
 
-BASE_URL = "https://www.nhs.uk/conditions/"
+BASE_URL = os.environ.get("NHS_BASE_URL", "https://www.nhs.uk/conditions/")
 OUTPUT_FILE = "medical_data.json"
+CHECKPOINT_FILE = "medical_data.crawl.jsonl" # Crawl state; lets interrupted runs resume
 TARGET_COUNT = 550 # Aim for >500
 
-def get_all_condition_links() -> List[Dict[str, str]]:
-    print(f"Fetching A-Z Index from {BASE_URL}...")
-    headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
+CONCURRENCY = 8 # Pages in flight at once
+REQUESTS_PER_SECOND = 10.0 # Per host, to stay polite to the NHS site
+REQUEST_TIMEOUT = 5
+# Pages fetched more recently than this are reused without any request,
+# which is what lets an interrupted run pick up where it stopped
+FRESH_FOR = 12 * 60 * 60
+
+HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
+
+
+class HostRateLimiter:
+    """
+    Spaces out request starts to at most `rate` per second for each host.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = {}
+        self._lock = asyncio.Lock()
+
+    async def wait(self, url: str):
+        host = urlparse(url).netloc
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class Checkpoint:
+    """
+    Append-only JSONL log of crawled pages: URL, validators (ETag and
+    Last-Modified), fetch time and the parsed entry. Every result is
+    flushed as soon as it is known, so a crash loses at most the pages
+    that were in flight. Later lines win on reload.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.pages = {}
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue # Torn last line from an interrupted run
+                    self.pages[record["url"]] = record
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, "a")
+        return self
+
+    def __exit__(self, *exc):
+        self._file.close()
+        self._file = None
+
+    def record(self, record: Dict[str, Any]):
+        self.pages[record["url"]] = record
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+
+    def compact(self):
+        """
+        Rewrites the log with one line per page.
+        """
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            for record in self.pages.values():
+                f.write(json.dumps(record) + "\n")
+        os.replace(tmp_path, self.path)
+
+
+def parse_index(content: bytes, base_url: str = BASE_URL) -> List[Dict[str, str]]:
+    soup = BeautifulSoup(content, 'html.parser')
+
+    # NHS A-Z list is usually in a specialized container
+    # We look for links in the main content area
+    links = []
+    main_content = soup.find('main') or soup.find('div', class_='nhsuk-a-to-z-list') or soup
+
+    if main_content:
+        for a in main_content.find_all('a', href=True):
+            href = a['href']
+            # Filter for condition links (usually /conditions/slug/)
+            if "/conditions/" in href and not href.rstrip("/").endswith("/conditions"):
+                # Ensure full URL
+                href = urljoin(base_url, href)
+
+                name = a.get_text().strip()
+                if name:
+                    links.append({"url": href, "name": name})
+
+    # Remove duplicates
+    unique_links = {v['url']:v for v in links}.values()
+    return list(unique_links)
+
+
+async def get_all_condition_links(client: httpx.AsyncClient, base_url: str = BASE_URL) -> List[Dict[str, str]]:
+    print(f"Fetching A-Z Index from {base_url}...")
     try:
-        response = requests.get(BASE_URL, headers=headers)
+        response = await client.get(base_url)
         if response.status_code != 200:
             print(f"Failed to fetch index: {response.status_code}")
             return []
-            
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # NHS A-Z list is usually in a specialized container
-        # We look for links in the main content area
-        links = []
-        main_content = soup.find('main') or soup.find('div', class_='nhsuk-a-to-z-list') or soup
-        
-        if main_content:
-            for a in main_content.find_all('a', href=True):
-                href = a['href']
-                # Filter for condition links (usually /conditions/slug/)
-                if "/conditions/" in href and href != "/conditions/":
-                    # Ensure full URL
-                    if not href.startswith("http"):
-                        href = "https://www.nhs.uk" + href
-                    
-                    name = a.get_text().strip()
-                    if name:
-                        links.append({"url": href, "name": name})
-                    
-        # Remove duplicates
-        unique_links = {v['url']:v for v in links}.values()
-        print(f"Found {len(unique_links)} potential conditions in index.")
-        return list(unique_links)
-        
+
+        links = await asyncio.to_thread(parse_index, response.content, base_url)
+        print(f"Found {len(links)} potential conditions in index.")
+        return links
+
     except Exception as e:
         print(f"Error fetching index: {e}")
         return []
 
-def scrape_condition_page(url: str, name: str) -> Optional[Dict[str, Any]]:
+
+def parse_condition_page(content: bytes, name: str) -> Optional[Dict[str, Any]]:
+    soup = BeautifulSoup(content, 'html.parser')
+    main_content = soup.find('main')
+    if not main_content: return None
+
+    # Extract description (first meaningful paragraph)
+    explanation = "Information not available."
+    keywords = name.lower().split() # Basic keywords from title
+
+    # Try to find specific summary text
+    summary_section = main_content.find('section', class_='nhsuk-section') or main_content
+    for p in summary_section.find_all('p'):
+        text: str = p.get_text().strip()
+        if len(text) > 40:
+            explanation = text
+            # Extract more keywords from explanation
+            all_words: List[str] = [w for w in text.lower().split() if len(w) > 4]
+            keywords.extend(all_words[0:5])
+            break
+
+    # Naive keyword extraction cleanup
+    keywords = list(set(keywords))
+
+    # Generate generic but safe advice if specific sections aren't parseable
+    short_explanation = explanation[:300] + "..." if len(explanation) > 300 else explanation
+
+    return {
+        "condition": name,
+        "keywords": keywords,
+        "stage": "Clinical Presentation",
+        "explanation": short_explanation,
+        "treatment_guidance": "Please consult a healthcare professional for specific treatment advice relative to this condition.",
+        "medications": ["Consult Doctor"],
+        "dos": ["Monitor symptoms", "Keep a symptom diary"],
+        "donts": ["Do not self-medicate without advice"],
+        "referral": "Refer to GP if symptoms persist."
+    }
+
+
+async def scrape_condition_page(client: httpx.AsyncClient, limiter: HostRateLimiter,
+                                item: Dict[str, str], previous: Optional[Dict[str, Any]]):
+    """
+    Fetches one condition page, conditionally if it was crawled before.
+    Returns (checkpoint record, outcome), or (None, "failed") on a network
+    error, 429 or 5xx so the page is retried next run.
+    """
+    headers = {}
+    if previous:
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+
+    await limiter.wait(item["url"])
     try:
-        headers = {'User-Agent': 'Mozilla/5.0'}
-        response = requests.get(url, headers=headers, timeout=5)
-        if response.status_code != 200:
-            return None
-            
-        soup = BeautifulSoup(response.content, 'html.parser')
-        main_content = soup.find('main')
-        if not main_content: return None
-
-        # Extract description (first meaningful paragraph)
-        explanation = "Information not available."
-        keywords = name.lower().split() # Basic keywords from title
-        
-        # Try to find specific summary text
-        summary_section = main_content.find('section', class_='nhsuk-section') or main_content
-        for p in summary_section.find_all('p'):
-            text: str = p.get_text().strip()
-            if len(text) > 40:
-                explanation = text
-                # Extract more keywords from explanation
-                all_words: List[str] = [w for w in text.lower().split() if len(w) > 4]
-                keywords.extend(all_words[0:5])
-                break
-        
-        # Naive keyword extraction cleanup
-        keywords = list(set(keywords))
-        
-        # Generate generic but safe advice if specific sections aren't parseable
-        short_explanation = explanation[:300] + "..." if len(explanation) > 300 else explanation
-        
-        return {
-            "condition": name,
-            "keywords": keywords,
-            "stage": "Clinical Presentation",
-            "explanation": short_explanation,
-            "treatment_guidance": "Please consult a healthcare professional for specific treatment advice relative to this condition.",
-            "medications": ["Consult Doctor"],
-            "dos": ["Monitor symptoms", "Keep a symptom diary"],
-            "donts": ["Do not self-medicate without advice"],
-            "referral": "Refer to GP if symptoms persist."
-        }
+        response = await client.get(item["url"], headers=headers)
+    except httpx.HTTPError:
+        return None, "failed"
+
+    if response.status_code == 429 or response.status_code >= 500:
+        return None, "failed" # Transient; keep the previous record and retry next run
+
+    # Only a page we got, or confirmed unchanged, counts as fresh
+    record = {"url": item["url"], "name": item["name"]}
+    if response.status_code == 304 and previous:
+        record.update(etag=previous.get("etag"), last_modified=previous.get("last_modified"),
+                      entry=previous.get("entry"), fetched_at=time.time())
+        return record, "not_modified"
+
+    record.update(etag=response.headers.get("etag"),
+                  last_modified=response.headers.get("last-modified"), entry=None)
+    if response.status_code == 200:
+        record["fetched_at"] = time.time()
+        # BeautifulSoup is CPU-bound; keep it off the event loop
+        record["entry"] = await asyncio.to_thread(parse_condition_page, response.content, item["name"])
+    return record, "fetched"
+
+
+async def build_dataset(base_url: str = BASE_URL, output_file: str = OUTPUT_FILE,
+                        checkpoint_file: str = CHECKPOINT_FILE, target_count: int = TARGET_COUNT,
+                        concurrency: int = CONCURRENCY, rate: float = REQUESTS_PER_SECOND,
+                        fresh_for: float = FRESH_FOR):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(headers=HEADERS, timeout=REQUEST_TIMEOUT, limits=limits,
+                                 follow_redirects=True) as client:
+        all_links = await get_all_condition_links(client, base_url)
+
+        if not all_links:
+            print("No links found. Aborting.")
+            return
 
-    except Exception as e:
-        # print(f"Error scraping {name}: {e}")
-        return None
-
-def build_dataset():
-    all_links = get_all_condition_links()
-    
-    if not all_links:
-        print("No links found. Aborting.")
-        return
-
-    final_data: List[Dict[str, Any]] = []
-    count: int = 0
-    
-    print(f"Starting mass scrape. Target: {TARGET_COUNT}")
-    
-    for item in all_links:
-        if count >= TARGET_COUNT: break
-        
         # Skip if looked like a category/index page (simple heuristic)
-        if "advice" in item['url']: continue 
-
-        data = scrape_condition_page(item['url'], item['name'])
-        if data:
-            final_data.append(data)
-            count = count + 1
-            if count % 10 == 0:
-                print(f"Scraped {count}/{TARGET_COUNT}: {item['name']}")
-        
-        # Aggressive rate limiting to be safe, but fast enough for demo
-        time.sleep(0.1) 
-
-    # Save
-    with open(OUTPUT_FILE, "w") as f:
+        links = [item for item in all_links if "advice" not in item['url']]
+
+        limiter = HostRateLimiter(rate)
+        stats = {"fetched": 0, "not_modified": 0, "fresh": 0, "failed": 0}
+        pending = asyncio.Queue()
+        for item in links:
+            pending.put_nowait(item)
+
+        print(f"Starting mass scrape. Target: {target_count}")
+        with Checkpoint(checkpoint_file) as checkpoint:
+
+            def scraped() -> int:
+                return sum(1 for item in links if (checkpoint.pages.get(item["url"]) or {}).get("entry"))
+
+            count = scraped()
+
+            async def worker():
+                nonlocal count
+                while not pending.empty():
+                    item = pending.get_nowait()
+                    previous = checkpoint.pages.get(item["url"])
+                    if previous and time.time() - previous.get("fetched_at", 0) < fresh_for:
+                        stats["fresh"] += 1
+                        continue
+                    # The target only limits new pages; stale ones are always revalidated
+                    if not previous and count >= target_count:
+                        continue
+
+                    record, outcome = await scrape_condition_page(client, limiter, item, previous)
+                    stats[outcome] += 1
+                    if record is None:
+                        continue
+                    had_entry = bool(previous and previous.get("entry"))
+                    checkpoint.record(record)
+                    if record["entry"] and not had_entry:
+                        count += 1
+                        if count % 10 == 0:
+                            print(f"Scraped {count}/{target_count}: {item['name']}")
+                    elif had_entry and not record["entry"]:
+                        count -= 1 # The page is gone
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        checkpoint.compact()
+
+    # Save, in index order, replacing the old file only once it is complete
+    final_data = [checkpoint.pages[item["url"]]["entry"] for item in links
+                  if (checkpoint.pages.get(item["url"]) or {}).get("entry")][:target_count]
+    tmp_path = output_file + ".tmp"
+    with open(tmp_path, "w") as f:
         json.dump(final_data, f, indent=2)
-    print(f"Successfully built dataset with {len(final_data)} conditions.")
+    os.replace(tmp_path, output_file)
+    print(f"Successfully built dataset with {len(final_data)} conditions "
+          f"({stats['fetched']} fetched, {stats['not_modified']} unchanged, "
+          f"{stats['fresh']} reused from checkpoint, {stats['failed']} failed).")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl NHS condition pages into the knowledge base file.")
+    parser.add_argument("--base-url", default=BASE_URL, help="A-Z index URL to crawl")
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--checkpoint", default=CHECKPOINT_FILE)
+    parser.add_argument("--target", type=int, default=TARGET_COUNT)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--rate", type=float, default=REQUESTS_PER_SECOND,
+                        help="max requests per second per host")
+    parser.add_argument("--fresh-for", type=float, default=FRESH_FOR,
+                        help="seconds a checkpointed page is reused without revalidating")
+    args = parser.parse_args()
+    asyncio.run(build_dataset(args.base_url, args.output, args.checkpoint, args.target,
+                              args.concurrency, args.rate, args.fresh_for))
+
 
 if __name__ == "__main__":
-    build_dataset()
+    main()
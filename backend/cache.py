@@ -0,0 +1,238 @@
+import atexit
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+MISSING = object()  # Returned by get() on a miss, since None is a valid cached value
+
+# Seconds between batched writes of a persistent cache to disk
+FLUSH_INTERVAL = 1.0
+
+
+class TTLCache:
+    """
+    Size-bounded LRU cache with a per-entry time-to-live.
+    If path is given, entries are also written to a SQLite file so they
+    survive restarts. Persisted values must be JSON-serializable. Writes
+    are batched into one transaction per flush_interval by a background
+    thread, so set() never waits on the disk; the file keeps at most
+    max_disk_entries rows (and max_disk_bytes of values as JSON, if
+    given), dropping those closest to expiry first. A get() that misses
+    memory reads the file, so async callers run it in a worker thread.
+    If max_bytes is given, entries are also evicted once their total
+    sizeof() exceeds it (by default, the length of the value as JSON).
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600, path: str = None,
+                 max_bytes: int = None, sizeof=None, max_disk_entries: int = None,
+                 max_disk_bytes: int = None, flush_interval: float = FLUSH_INTERVAL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_disk_entries = max_disk_entries or 10 * max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.flush_interval = flush_interval
+        self.sizeof = sizeof or (lambda value: len(json.dumps(value)))
+        self._entries = OrderedDict()  # key -> (expires_at, value, size)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+        self.disk_hits = 0
+        self.disk_evictions = 0
+        self.disk_entries = 0
+        self.disk_bytes = 0
+        self._db = None
+        if path:
+            self._open_db(path)
+
+    def _open_db(self, path: str):
+        # The writer thread has its own connection; with WAL, lookups on
+        # this one are never blocked by a flush in progress
+        self._writer_db = sqlite3.connect(path, check_same_thread=False)
+        self._writer_db.execute("PRAGMA journal_mode=WAL")
+        self._writer_db.execute(
+            "CREATE TABLE IF NOT EXISTS cache "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._writer_db.execute("CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)")
+        self._writer_db.commit()
+        # Running totals, so a flush never has to scan the whole table
+        self.disk_entries, self.disk_bytes = self._writer_db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM cache"
+        ).fetchone()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._pending = {}  # key -> (expires_at, value), or None to delete; not yet on disk
+        self._flush_lock = threading.Lock()
+        self.flush()
+        threading.Thread(target=self._write_behind, daemon=True).start()
+        atexit.register(self.flush)
+
+    def get(self, key: str, default=MISSING):
+        now = time.time()
+        with self._lock:
+            item = self._entries.get(key)
+            # Written but not yet flushed (None: deleted but not yet flushed)
+            pending = self._pending.get(key, MISSING) if self._db is not None else None
+
+        from_disk = item is None and pending is MISSING
+        if from_disk:
+            # Read the file outside the lock, so other lookups do not wait on it
+            item = self._load(key)
+        elif item is None:
+            item = pending
+
+        with self._lock:
+            current = self._entries.get(key)
+            if current is not None:
+                item = current  # Set while the file was read
+            elif item is not None:
+                if from_disk and item[0] >= now:
+                    self.disk_hits += 1
+                self._store(key, *item)
+            if item is None or item[0] < now:
+                if item is not None:
+                    self._delete(key)
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def _load(self, key: str):
+        """
+        (expires_at, value) from the disk tier, or None.
+        """
+        row = self._db.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+        return (row[1], json.loads(row[0])) if row else None
+
+    def set(self, key: str, value, ttl: float = None):
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._store(key, expires_at, value)
+            if self._db is not None:
+                self._pending[key] = (expires_at, value)
+
+    def _write_behind(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"Could not write cache to {self.path}: {e}")
+
+    def flush(self):
+        """
+        Writes pending changes to disk in one transaction and prunes expired
+        and surplus rows.
+        """
+        if self._db is None:
+            return
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            db = self._writer_db
+            with db:  # One transaction
+                for key, item in pending.items():
+                    row = db.execute("SELECT LENGTH(value) FROM cache WHERE key = ?", (key,)).fetchone()
+                    if row:
+                        self.disk_entries -= 1
+                        self.disk_bytes -= row[0]
+                    if item is None:
+                        db.execute("DELETE FROM cache WHERE key = ?", (key,))
+                        continue
+                    value = json.dumps(item[1])
+                    db.execute("INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                               (key, value, item[0]))
+                    self.disk_entries += 1
+                    self.disk_bytes += len(value)
+
+                now = time.time()
+                expired, expired_bytes = db.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM cache WHERE expires_at < ?", (now,)
+                ).fetchone()
+                if expired:
+                    db.execute("DELETE FROM cache WHERE expires_at < ?", (now,))
+                    self.disk_entries -= expired
+                    self.disk_bytes -= expired_bytes
+                self._evict_disk(db)
+
+    def _over_disk_limits(self) -> bool:
+        return self.disk_entries > self.max_disk_entries or (
+            self.max_disk_bytes is not None and self.disk_bytes > self.max_disk_bytes
+        )
+
+    def _evict_disk(self, db):
+        if not self._over_disk_limits():
+            return
+        victims = []
+        for key, size in db.execute("SELECT key, LENGTH(value) FROM cache ORDER BY expires_at"):
+            if not self._over_disk_limits():
+                break
+            victims.append((key,))
+            self.disk_entries -= 1
+            self.disk_bytes -= size
+        db.executemany("DELETE FROM cache WHERE key = ?", victims)
+        self.disk_evictions += len(victims)
+
+    def _store(self, key, expires_at, value):
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old[2]
+        self._entries[key] = (expires_at, value, size)
+        self.bytes += size
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or (self.max_bytes is not None and self.bytes > self.max_bytes)
+        ):
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= evicted[2]
+            self.evictions += 1
+
+    def _delete(self, key):
+        item = self._entries.pop(key, None)
+        if item is not None:
+            self.bytes -= item[2]
+        if self._db is not None:
+            self._pending[key] = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+        if self._db is not None:
+            with self._flush_lock:
+                with self._lock:
+                    self._pending.clear()
+                with self._writer_db:
+                    self._writer_db.execute("DELETE FROM cache")
+                self.disk_entries = self.disk_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        stats = {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+        if self.max_bytes is not None:
+            stats.update(bytes=self.bytes, max_bytes=self.max_bytes)
+        if self._db is not None:
+            stats.update(pending_writes=len(self._pending), disk_entries=self.disk_entries,
+                         max_disk_entries=self.max_disk_entries, disk_hits=self.disk_hits,
+                         disk_evictions=self.disk_evictions)
+            if self.max_disk_bytes is not None:
+                stats.update(disk_bytes=self.disk_bytes, max_disk_bytes=self.max_disk_bytes)
+        return stats
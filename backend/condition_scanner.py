@@ -0,0 +1,115 @@
+from .search_index import MIN_NAME_LENGTH, tokenize
+
+_END = None  # Trie key marking the end of a condition name
+
+
+class ConditionScanner:
+    """
+    Multi-pattern matcher over every condition name in the knowledge base.
+    Names are stored in a token trie, so a report is tokenized once and
+    scanned in a single left-to-right pass. Matches respect word boundaries
+    and the longest name wins ("Type 2 diabetes" over "diabetes").
+    """
+
+    def __init__(self, entries=()):
+        self.trie = {}
+        self.name_lengths = {}
+        for entry_id, entry in enumerate(entries):
+            self.add(entry_id, entry)
+
+    def add(self, entry_id: int, entry: dict):
+        name = entry["condition"]
+        tokens = tokenize(name)
+        if not tokens or len(name.strip()) < MIN_NAME_LENGTH:
+            return
+        node = self.trie
+        for token in tokens:
+            node = node.setdefault(token, {})
+        # Keep the first entry registered under a given name
+        node.setdefault(_END, entry_id)
+        self.name_lengths[entry_id] = len(name)
+
+    def remove(self, entry_id: int, entry: dict):
+        if self.name_lengths.pop(entry_id, None) is None:
+            return
+        node = self.trie
+        for token in tokenize(entry["condition"]):
+            node = node.get(token)
+            if node is None:
+                return
+        if node.get(_END) == entry_id:
+            del node[_END]
+
+    def copy(self):
+        def copy_node(node):
+            return {key: value if key is _END else copy_node(value) for key, value in node.items()}
+
+        clone = ConditionScanner()
+        clone.trie = copy_node(self.trie)
+        clone.name_lengths = dict(self.name_lengths)
+        return clone
+
+    def longest_match(self, tokens: list, start: int, cache: dict = None):
+        """
+        Returns (entry_id, end) for the longest name starting at tokens[start],
+        or (None, start). cache may hold lookups reused across positions.
+        """
+        node = self.trie
+        match_id = None
+        match_end = start
+        j = start
+        while j < len(tokens):
+            node = node.get(tokens[j])
+            if node is None:
+                break
+            j += 1
+            if _END in node:
+                match_id = node[_END]
+                match_end = j
+        return match_id, match_end
+
+    def count(self, text: str) -> dict:
+        """
+        Returns {entry_id: occurrences} for every condition named in the text.
+        """
+        tokens = tokenize(text)
+        cache = {}
+        counts = {}
+        i = 0
+        while i < len(tokens):
+            match_id, match_end = self.longest_match(tokens, i, cache)
+            if match_id is None:
+                i += 1
+            else:
+                counts[match_id] = counts.get(match_id, 0) + 1
+                i = match_end
+        return counts
+
+    def best(self, counts: dict):
+        """
+        Picks the most frequently mentioned condition.
+        Ties go to the longer (more specific) name, then the earliest entry.
+        """
+        if not counts:
+            return None
+        return min(
+            counts,
+            key=lambda entry_id: (-counts[entry_id], -self.name_lengths[entry_id], entry_id),
+        )
+
+    def merge_counts(self, counts: dict, more: dict):
+        for entry_id, count in more.items():
+            counts[entry_id] = counts.get(entry_id, 0) + count
+
+    def is_confident(self, counts: dict, min_mentions: int, margin: float) -> bool:
+        """
+        True once the leading condition has at least min_mentions and is
+        mentioned margin times as often as the runner-up.
+        """
+        if not counts:
+            return False
+        top, runner_up = (sorted(counts.values(), reverse=True) + [0])[:2]
+        return top >= min_mentions and top >= margin * runner_up
+
+    def best_match(self, text: str):
+        return self.best(self.count(text))
@@ -0,0 +1,119 @@
+import asyncio
+import os
+import time
+
+from . import metrics
+
+ENRICHMENT_WORKERS = int(os.environ.get("ENRICHMENT_WORKERS", 4))
+# Queries waiting for a web lookup; beyond this, new ones are turned away
+ENRICHMENT_QUEUE_SIZE = int(os.environ.get("ENRICHMENT_QUEUE_SIZE", 256))
+
+
+class EnrichmentQueue:
+    """
+    Bounded background queue of live web lookups.
+    Workers call lookup(query) and, when it finds something, learn(result)
+    in a thread (returning True if the result was new), so the knowledge
+    base grows without requests waiting on it. Futures resolve with the
+    lookup result, or None. A query that is already queued or in flight is not queued twice,
+    and when the queue is full new queries are dropped rather than
+    letting the backlog grow.
+    """
+
+    def __init__(self, lookup, learn, workers: int = ENRICHMENT_WORKERS,
+                 max_depth: int = ENRICHMENT_QUEUE_SIZE):
+        self.lookup = lookup
+        self.learn = learn
+        self.workers = workers
+        self.max_depth = max_depth
+        self._queue = None
+        self._tasks = []
+        self._pending = {}  # query -> future resolved with the lookup result, or None
+        self._started_at = None
+        self.submitted = 0
+        self.deduplicated = 0
+        self.dropped = 0
+        self.processed = 0
+        self.found = 0
+        self.learned = 0
+        self.failed = 0
+
+    def start(self):
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_depth)
+        self._started_at = time.perf_counter()
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for future in self._pending.values():
+            if not future.done():
+                future.set_result(None)
+        self._pending.clear()
+
+    def submit(self, query: str):
+        """
+        Queues a lookup and returns a future for its outcome, or None if
+        the queue is full or not running. Never blocks.
+        """
+        future = self._pending.get(query)
+        if future is not None:
+            self.deduplicated += 1
+            return future
+        if self._queue is None:
+            return None
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait(query)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            metrics.increment("rural_ai_enrichment_dropped_total")
+            return None
+        self._pending[query] = future
+        self.submitted += 1
+        return future
+
+    async def _run(self):
+        while True:
+            query = await self._queue.get()
+            future = self._pending.get(query)
+            start = time.perf_counter()
+            outcome = None
+            try:
+                result = await self.lookup(query)
+                if result:
+                    outcome = result
+                    self.found += 1
+                    # Publishing a new snapshot copies the indexes; keep it off the event loop
+                    if await asyncio.to_thread(self.learn, result):
+                        self.learned += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e: # pylint: disable=broad-exception-caught
+                self.failed += 1
+                print(f"Background enrichment failed for '{query}': {e}")
+            finally:
+                self.processed += 1
+                self._pending.pop(query, None)
+                if future is not None and not future.done():
+                    future.set_result(outcome)
+                metrics.observe("rural_ai_enrichment_seconds", time.perf_counter() - start)
+
+    def stats(self) -> dict:
+        uptime = time.perf_counter() - self._started_at if self._started_at else 0.0
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "in_flight": len(self._pending) - (self._queue.qsize() if self._queue is not None else 0),
+            "submitted": self.submitted,
+            "deduplicated": self.deduplicated,
+            "dropped": self.dropped,
+            "processed": self.processed,
+            "found": self.found,
+            "learned": self.learned,
+            "failed": self.failed,
+            "per_minute": round(self.processed / uptime * 60, 2) if uptime else 0.0,
+        }
@@ -0,0 +1,103 @@
+import difflib
+import heapq
+
+from .search_index import MIN_NAME_LENGTH, insert_posting, remove_posting, tokenize
+
+# How many trigram-ranked candidates get re-scored with SequenceMatcher
+CANDIDATE_POOL = 20
+
+
+def normalize_name(text: str) -> str:
+    return " ".join(tokenize(text))
+
+
+def trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FuzzyIndex:
+    """
+    Character-trigram index over normalized condition names.
+    Trigram overlap narrows the search to a small candidate pool, which is
+    then scored with the same ratio difflib.get_close_matches uses.
+    """
+
+    def __init__(self, entries=()):
+        self.postings = {}
+        self.names = {}
+        self.trigram_counts = {}
+        self._seen = set()
+        for entry_id, entry in enumerate(entries):
+            self.add(entry_id, entry)
+
+    def add(self, entry_id: int, entry: dict):
+        name = normalize_name(entry["condition"])
+        # Duplicate names would only crowd the candidate pool
+        if len(name) < MIN_NAME_LENGTH or name in self._seen:
+            return
+        self._seen.add(name)
+        grams = trigrams(name)
+        self.names[entry_id] = name
+        self.trigram_counts[entry_id] = len(grams)
+        for gram in grams:
+            insert_posting(self.postings, gram, entry_id)
+
+    def has_name(self, name: str) -> bool:
+        """
+        True if the normalized name is already indexed.
+        """
+        return name in self._seen
+
+    def remove(self, entry_id: int, entry: dict):
+        name = self.names.pop(entry_id, None)
+        if name is None:
+            return
+        self._seen.discard(name)
+        del self.trigram_counts[entry_id]
+        for gram in trigrams(name):
+            remove_posting(self.postings, gram, entry_id)
+
+    def copy(self):
+        clone = FuzzyIndex()
+        clone.postings = {gram: list(ids) for gram, ids in self.postings.items()}
+        clone.names = dict(self.names)
+        clone.trigram_counts = dict(self.trigram_counts)
+        clone._seen = set(self._seen)
+        return clone
+
+    def search(self, query: str, k: int = 1, cutoff: float = 0.6) -> list:
+        """
+        Returns up to k (entry_id, similarity) pairs scoring at least
+        cutoff, best first.
+        """
+        query = normalize_name(query)
+        if not query:
+            return []
+        query_grams = trigrams(query)
+
+        shared = {}
+        for gram in query_grams:
+            for entry_id in self.postings.get(gram, ()):
+                shared[entry_id] = shared.get(entry_id, 0) + 1
+
+        # Dice coefficient on trigram sets picks the pool to re-score
+        pool = heapq.nlargest(
+            CANDIDATE_POOL,
+            shared,
+            key=lambda entry_id: shared[entry_id] / (len(query_grams) + self.trigram_counts[entry_id]),
+        )
+
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq2(query)
+        results = []
+        for entry_id in pool:
+            matcher.set_seq1(self.names[entry_id])
+            if matcher.real_quick_ratio() < cutoff or matcher.quick_ratio() < cutoff:
+                continue
+            score = matcher.ratio()
+            if score >= cutoff:
+                results.append((entry_id, score))
+
+        results.sort(key=lambda result: (-result[1], result[0]))
+        return results[:k]
@@ -1,33 +1,170 @@
 from fastapi import UploadFile
-import torch
-from torchvision import transforms
-from PIL import Image
-import io
+import asyncio
+import json
+import os
+from . import metrics
+from .inference_queue import InferenceQueue
+
+# TorchScript (or pickled) classifier; without one, images are matched by filename
+IMAGE_MODEL_PATH = os.environ.get("IMAGE_MODEL_PATH", "")
+# JSON list of class labels in model output order
+IMAGE_LABELS_PATH = os.environ.get("IMAGE_LABELS_PATH", "")
+
+# Uploads above this many pixels are rejected before decoding
+MAX_IMAGE_PIXELS = int(os.environ.get("MAX_IMAGE_PIXELS", 50_000_000))
+RESIZE_TO = 256  # Shorter side after preprocessing, before the 224 center crop
+
+# IMAGE_MODEL_PATH value that loads a tiny untrained CNN for local testing
+STAND_IN_MODEL = "stand-in"
+STAND_IN_LABELS = ["Eczema", "Psoriasis", "Acne", "Ringworm", "Chickenpox"]
+
+_model = None
+_labels = None
+_preprocess = None
+_queue = None
+
+
+def model_configured() -> bool:
+    return bool(IMAGE_MODEL_PATH)
+
+
+def get_preprocess():
+    """
+    The preprocessing pipeline, built once and shared by every request.
+    """
+    global _preprocess
+    if _preprocess is None:
+        from torchvision import transforms
+        _preprocess = transforms.Compose([
+            transforms.Resize(RESIZE_TO),
+            transforms.CenterCrop(224),
+            transforms.ToTensor(),
+            transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
+        ])
+    return _preprocess
+
+
+def build_stand_in_model(num_labels: int):
+    """
+    Small CNN with the input and output shapes of a real classifier, for
+    exercising the batching pipeline without trained weights.
+    """
+    from torch import nn
+    return nn.Sequential(
+        nn.Conv2d(3, 8, kernel_size=3, stride=2, padding=1),
+        nn.ReLU(),
+        nn.Conv2d(8, 16, kernel_size=3, stride=2, padding=1),
+        nn.ReLU(),
+        nn.AdaptiveAvgPool2d(1),
+        nn.Flatten(),
+        nn.Linear(16, num_labels),
+    )
+
+
+def load_model(path: str = IMAGE_MODEL_PATH, labels_path: str = IMAGE_LABELS_PATH):
+    # torch/torchvision take seconds to import; only pay for it when a model is configured
+    import torch
+    global _model, _labels
+
+    if labels_path:
+        with open(labels_path, "r") as f:
+            labels = json.load(f)
+    elif path == STAND_IN_MODEL:
+        labels = STAND_IN_LABELS
+    else:
+        raise ValueError("IMAGE_LABELS_PATH must be set when IMAGE_MODEL_PATH is")
+
+    if path == STAND_IN_MODEL:
+        torch.manual_seed(0)
+        model = build_stand_in_model(len(labels))
+    else:
+        try:
+            model = torch.jit.load(path, map_location="cpu")
+        except RuntimeError:
+            model = torch.load(path, map_location="cpu", weights_only=False)
+    model.eval()
+    get_preprocess()
+
+    _model, _labels = model, labels
+    print(f"Loaded image model from {path} ({len(labels)} labels).")
+
+
+def decode_image(fp, target: int = RESIZE_TO, max_pixels: int = MAX_IMAGE_PIXELS):
+    """
+    Decodes an image to RGB at roughly the size preprocessing needs.
+    JPEGs are decoded by libjpeg at 1/2, 1/4 or 1/8 scale, and other
+    formats are box-downscaled after decoding; either way the shorter side
+    stays at or above target. Raises ValueError for images over max_pixels.
+    """
+    from PIL import Image
+
+    image = Image.open(fp)  # Reads the header only
+    width, height = image.size
+    if width * height > max_pixels:
+        raise ValueError(f"Image is {width}x{height}, over the {max_pixels} pixel limit")
+    if image.format == "JPEG":
+        image.draft("RGB", (target, target))
+    image = image.convert("RGB")
+    factor = min(image.size) // target
+    if factor >= 2:
+        image = image.reduce(factor)
+    return image
+
+
+def preprocess_image(fp):
+    """
+    Decodes and preprocesses one upload. Runs in a worker thread.
+    """
+    with metrics.span("image_decode"):
+        fp.seek(0)
+        image = decode_image(fp)
+    with metrics.span("image_preprocess"):
+        return get_preprocess()(image)
+
+
+def predict_batch(tensors: list) -> list:
+    """
+    Classifies a batch of preprocessed images in one forward pass.
+    """
+    import torch
+
+    with metrics.span("inference"), torch.inference_mode():
+        probabilities = torch.softmax(_model(torch.stack(tensors)), dim=1)
+        confidences, indices = probabilities.max(dim=1)
+    return [
+        {"condition": _labels[index], "confidence": round(confidence, 3)}
+        for confidence, index in zip(confidences.tolist(), indices.tolist())
+    ]
+
+
+def start_inference():
+    global _queue
+    if _queue is None:
+        _queue = InferenceQueue(predict_batch)
+        _queue.start()
+
+
+async def stop_inference():
+    global _queue
+    if _queue is not None:
+        await _queue.stop()
+        _queue = None
+
+
+def inference_ready() -> bool:
+    return _queue is not None and _model is not None
+
+
+def inference_stats() -> dict:
+    return _queue.stats() if _queue is not None else {}
 
-# Placeholder for model loading
-# model = torch.load("path/to/model")
 
 async def process_image(file: UploadFile):
-    contents = await file.read()
-    image = Image.open(io.BytesIO(contents)).convert("RGB")
-
-    # Preprocessing
-    preprocess = transforms.Compose([
-        transforms.Resize(256),
-        transforms.CenterCrop(224),
-        transforms.ToTensor(),
-        transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
-    ])
-    
-    input_tensor = preprocess(image)
-    input_batch = input_tensor.unsqueeze(0) # Create a mini-batch as expected by the model
-    
-    # Inference (Placeholder)
-    # with torch.no_grad():
-    #     output = model(input_batch)
-    
-    # Mock result
-    return {
-        "condition": "Likely Eczema",
-        "confidence": 0.85
-    }
+    """
+    Classifies an uploaded image. Preprocessing runs in a worker thread and
+    the forward pass is shared with other requests through the batching queue.
+    Raises asyncio.QueueFull when the model is too far behind.
+    """
+    # Decode straight from the spooled upload rather than copying it into memory
+    input_tensor = await asyncio.to_thread(preprocess_image, file.file)
+    return await _queue.submit(input_tensor)
@@ -0,0 +1,121 @@
+import asyncio
+import os
+import time
+
+from . import metrics
+
+# Batching limits; a short wait trades a little latency for much larger batches
+MAX_BATCH_SIZE = int(os.environ.get("INFERENCE_MAX_BATCH", 8))
+MAX_WAIT = float(os.environ.get("INFERENCE_MAX_WAIT_MS", 10)) / 1000
+MAX_QUEUE_DEPTH = int(os.environ.get("INFERENCE_MAX_QUEUE", 64))
+
+
+class InferenceQueue:
+    """
+    Coalesces concurrent inference requests into batches.
+    A batch runs as soon as it holds max_batch_size inputs or its oldest
+    input has waited max_wait seconds. run_batch is called in a worker
+    thread with a list of inputs and must return one output per input;
+    each caller gets back its own output (or the batch's exception).
+    """
+
+    def __init__(self, run_batch, max_batch_size: int = MAX_BATCH_SIZE,
+                 max_wait: float = MAX_WAIT, max_depth: int = MAX_QUEUE_DEPTH):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = asyncio.Queue(maxsize=max_depth)
+        self._worker = None
+        self.batches = 0
+        self.items = 0
+        self.rejected = 0
+        self.last_batch_size = 0
+
+    def start(self):
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        while not self._queue.empty():
+            _, future, _ = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Inference queue stopped"))
+
+    async def submit(self, item):
+        """
+        Queues one input and waits for its output.
+        Raises asyncio.QueueFull when the backlog is already at max_depth.
+        """
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((item, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            metrics.increment("rural_ai_inference_rejected_total")
+            raise
+        return await future
+
+    async def _collect(self) -> list:
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            getter = asyncio.ensure_future(self._queue.get())
+            done, _ = await asyncio.wait((getter,), timeout=remaining)
+            if getter not in done:
+                getter.cancel()  # Nothing was taken; a late arrival stays queued
+                break
+            batch.append(getter.result())
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            # Skip callers that gave up (client disconnected) while queued
+            batch = [(item, future, queued) for item, future, queued in batch if not future.done()]
+            if not batch:
+                continue
+
+            start = time.perf_counter()
+            for _, _, queued in batch:
+                metrics.observe("rural_ai_inference_wait_seconds", start - queued)
+            try:
+                outputs = await asyncio.to_thread(self.run_batch, [item for item, _, _ in batch])
+                if len(outputs) != len(batch):
+                    raise RuntimeError(f"Model returned {len(outputs)} outputs for {len(batch)} inputs")
+            except Exception as e: # pylint: disable=broad-exception-caught
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for (_, future, _), output in zip(batch, outputs):
+                    if not future.done():
+                        future.set_result(output)
+            metrics.observe("rural_ai_inference_batch_seconds", time.perf_counter() - start)
+
+            self.batches += 1
+            self.items += len(batch)
+            self.last_batch_size = len(batch)
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "batches": self.batches,
+            "items": self.items,
+            "rejected": self.rejected,
+            "last_batch_size": self.last_batch_size,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+        }
@@ -0,0 +1,436 @@
+"""
+Prebuilt, memory-mapped knowledge base index.
+
+The build step writes every entry plus the name, keyword and trigram
+postings into one binary file. API workers open it with mmap read-only,
+so all workers on a host share the same page-cache pages instead of each
+parsing medical_data.json into its own copy. Strings and posting lists
+are read straight out of the mapping when a request needs them.
+
+    python -m backend.kb_index build --data medical_data.json --output medical_data.kbidx
+    KB_INDEX_FILE=medical_data.kbidx uvicorn backend.main:app --workers 4
+
+Each build bumps the generation number in the header and replaces the
+file atomically; running workers notice the new generation and remap it.
+Conditions learned after a build are layered on top in memory until the
+next build folds them in.
+"""
+import argparse
+import bisect
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Mapping, Sequence
+
+from .condition_scanner import ConditionScanner
+from .fuzzy_index import FuzzyIndex
+from .records import FIELDS, ConditionRecord, to_record
+from .search_index import KeywordIndex
+
+MAGIC = b"RKBIDX01"
+HEADER = struct.Struct("<8sQI")  # magic, generation, section count
+SECTION = struct.Struct("<24sQQ")  # name, offset, length
+ALIGN = 8
+
+# Postings tables, each stored as sorted keys, offsets and entry ids
+POSTINGS = ("names", "keywords", "trigrams")
+LIST_FIELDS = ("keywords", "medications", "dos", "donts")
+
+
+def read_generation(path: str) -> int:
+    """
+    Generation number of the index file at path, or 0 if there is none.
+    """
+    try:
+        with open(path, "rb") as f:
+            header = f.read(HEADER.size)
+    except FileNotFoundError:
+        return 0
+    magic, generation, _ = HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a knowledge base index file")
+    return generation
+
+
+# --- Build ---
+class _StringTable:
+    """
+    Distinct UTF-8 strings, stored once however many entries share them.
+    """
+
+    def __init__(self):
+        self.ids = {}
+        self.data = bytearray()
+        self.offsets = array("q", [0])
+
+    def add(self, text: str) -> int:
+        string_id = self.ids.get(text)
+        if string_id is None:
+            string_id = self.ids[text] = len(self.ids)
+            self.data += text.encode("utf-8")
+            self.offsets.append(len(self.data))
+        return string_id
+
+
+def _postings_sections(name: str, postings: dict, strings: _StringTable) -> dict:
+    keys = sorted(
+        ((" ".join(key) if isinstance(key, tuple) else key).encode("utf-8"), ids)
+        for key, ids in postings.items() if ids
+    )
+    key_ids = array("i", (strings.add(key.decode("utf-8")) for key, _ in keys))
+    offsets = array("i", [0])
+    entry_ids = array("i")
+    for _, ids in keys:
+        entry_ids.extend(ids)
+        offsets.append(len(entry_ids))
+    return {f"{name}.keys": key_ids, f"{name}.offsets": offsets, f"{name}.ids": entry_ids}
+
+
+def write_index(entries, path: str) -> int:
+    """
+    Writes entries and their indexes to path and returns the new
+    generation. The file is replaced atomically, so workers still mapping
+    the old one keep reading it until they switch.
+    """
+    records = [to_record(entry) for entry in entries]
+    keyword_index = KeywordIndex(records)
+    scanner = ConditionScanner(records)
+    fuzzy_index = FuzzyIndex(records)
+
+    strings = _StringTable()
+    # Every field is a (start, count) run of string ids; scalars have
+    # count 1 and missing fields count -1
+    values = array("i")
+    fields = array("i")
+    for record in records:
+        for field in FIELDS:
+            value = getattr(record, field)
+            if value is None:
+                fields.extend((0, -1))
+                continue
+            items = value if isinstance(value, tuple) else (value,)
+            fields.extend((len(values), len(items)))
+            values.extend(strings.add(item) for item in items)
+
+    sections = {"entries": fields, "values": values}
+    sections.update(_postings_sections("names", keyword_index.name_postings, strings))
+    sections.update(_postings_sections("keywords", keyword_index.keyword_postings, strings))
+    sections.update(_postings_sections("trigrams", fuzzy_index.postings, strings))
+    sections["fuzzy.names"] = array("i", (
+        strings.add(fuzzy_index.names[i]) if i in fuzzy_index.names else -1 for i in range(len(records))
+    ))
+    sections["fuzzy.counts"] = array("i", (fuzzy_index.trigram_counts.get(i, 0) for i in range(len(records))))
+    sections["name_lengths"] = array("i", (scanner.name_lengths.get(i, -1) for i in range(len(records))))
+    sections["text"] = strings.data
+    sections["text.offsets"] = strings.offsets
+    sections["meta"] = json.dumps({
+        "entries": len(records),
+        "max_name_len": keyword_index.max_name_len,
+        "max_keyword_len": keyword_index.max_keyword_len,
+        "byteorder": sys.byteorder,
+    }).encode("utf-8")
+
+    generation = read_generation(path) + 1
+    offset = HEADER.size + SECTION.size * len(sections)
+    table = []
+    blobs = []
+    for name, data in sections.items():
+        offset += -offset % ALIGN
+        blob = data.tobytes() if isinstance(data, array) else bytes(data)
+        table.append(SECTION.pack(name.encode("ascii"), offset, len(blob)))
+        blobs.append((offset, blob))
+        offset += len(blob)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, generation, len(sections)))
+        f.write(b"".join(table))
+        for start, blob in blobs:
+            f.write(b"\0" * (start - f.tell()))
+            f.write(blob)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return generation
+
+
+# --- Read ---
+class _PostingsTable:
+    """
+    Sorted keys and their posting lists inside the mapping.
+    Keys are compared as UTF-8 bytes; posting lists come back as
+    zero-copy memoryview slices of int ids.
+    """
+
+    def __init__(self, index, name: str):
+        self.index = index
+        self.keys = index.section(f"{name}.keys", "i")
+        self.offsets = index.section(f"{name}.offsets", "i")
+        self.ids = index.section(f"{name}.ids", "i")
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __getitem__(self, position: int) -> bytes:
+        return self.index.raw_string(self.keys[position])
+
+    def find(self, key: bytes, lo: int = 0, hi: int = None) -> int:
+        hi = len(self.keys) if hi is None else hi
+        position = bisect.bisect_left(self, key, lo, hi)
+        return position if position < hi and self[position] == key else -1
+
+    def prefix_range(self, prefix: bytes, lo: int, hi: int):
+        """
+        Positions of the keys equal to prefix or continuing it with a
+        space ("type 2" covers "type 2 diabetes"); b"!" sorts right after
+        the space and before every token character.
+        """
+        lo = bisect.bisect_left(self, prefix, lo, hi)
+        return lo, bisect.bisect_left(self, prefix + b"!", lo, hi)
+
+    def postings_at(self, position: int):
+        return self.ids[self.offsets[position]:self.offsets[position + 1]]
+
+
+class _MappedPostings(Mapping):
+    """
+    A mapped postings table, read like the postings dict of an in-memory index.
+    """
+
+    def __init__(self, table: _PostingsTable, tuple_keys: bool):
+        self.table = table
+        self.tuple_keys = tuple_keys
+
+    def _encode(self, key) -> bytes:
+        return (" ".join(key) if self.tuple_keys else key).encode("utf-8")
+
+    def get(self, key, default=None):
+        position = self.table.find(self._encode(key))
+        return self.table.postings_at(position) if position >= 0 else default
+
+    def __getitem__(self, key):
+        ids = self.get(key)
+        if ids is None:
+            raise KeyError(key)
+        return ids
+
+    def __iter__(self):
+        for position in range(len(self.table)):
+            key = self.table[position].decode("utf-8")
+            yield tuple(key.split(" ")) if self.tuple_keys else key
+
+    def __len__(self):
+        return len(self.table)
+
+
+class _FuzzyNames:
+    def __init__(self, index):
+        self.index = index
+
+    def __getitem__(self, entry_id):
+        return self.index.fuzzy_name(entry_id)
+
+
+class MappedKeywordIndex(KeywordIndex):
+    """
+    Read-only KeywordIndex over the mapped name and keyword postings.
+    Learned entries are layered on top (see layered_index).
+    """
+
+    def __init__(self, index):  # pylint: disable=super-init-not-called
+        self.index = index
+        self.name_postings = _MappedPostings(index.postings["names"], True)
+        self.keyword_postings = _MappedPostings(index.postings["keywords"], True)
+        self.max_name_len = index.meta["max_name_len"]
+        self.max_keyword_len = index.meta["max_keyword_len"]
+
+
+class MappedFuzzyIndex(FuzzyIndex):
+    """
+    Read-only FuzzyIndex over the mapped trigram postings, names and trigram counts.
+    """
+
+    def __init__(self, index):  # pylint: disable=super-init-not-called
+        self.index = index
+        self.postings = _MappedPostings(index.postings["trigrams"], False)
+        self.names = _FuzzyNames(index)
+        self.trigram_counts = index.fuzzy_counts
+
+    def has_name(self, name: str) -> bool:
+        # The mapped names postings hold exactly the normalized names indexed here
+        return self.index.postings["names"].find(name.encode("utf-8")) >= 0
+
+
+class MappedScanner(ConditionScanner):
+    """
+    Read-only ConditionScanner that walks the sorted mapped names instead
+    of a trie. Each extra token narrows the range of names sharing the
+    tokens read so far, so a report is still scanned in one left-to-right
+    pass.
+    """
+
+    def __init__(self, index):  # pylint: disable=super-init-not-called
+        self.index = index
+        self.names = index.postings["names"]
+        self.name_lengths = index.name_lengths
+
+    def longest_match(self, tokens: list, start: int, cache: dict = None):
+        names = self.names
+        # Reports repeat words; cache the range of each first token
+        cache = {} if cache is None else cache
+        match_id = None
+        match_end = start
+        lo, hi = cache.get(tokens[start], (None, None))
+        if lo is None:
+            lo, hi = cache[tokens[start]] = names.prefix_range(tokens[start].encode(), 0, len(names))
+        prefix = tokens[start].encode()
+        j = start
+        while lo < hi:
+            j += 1
+            if names[lo] == prefix:
+                match_id = names.postings_at(lo)[0]
+                match_end = j
+            if j == len(tokens):
+                break
+            prefix += b" " + tokens[j].encode()
+            lo, hi = names.prefix_range(prefix, lo, hi)
+        return match_id, match_end
+
+
+class MappedRecords(Sequence):
+    """
+    The knowledge base entries, decoded from the mapping on access.
+    """
+
+    def __init__(self, index):
+        self.index = index
+
+    def __len__(self):
+        return self.index.size
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return tuple(self[i] for i in range(*position.indices(len(self))))
+        position = int(position)
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < self.index.size:
+            raise IndexError(position)
+        return self.index.record(position)
+
+
+class MappedIndex:
+    """
+    A read-only mapping of an index file written by write_index.
+    The mapping is released once nothing references it any more, so
+    requests still using an older generation finish undisturbed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+
+        magic, self.generation, section_count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a knowledge base index file")
+        self._sections = {}
+        for n in range(section_count):
+            name, offset, length = SECTION.unpack_from(self._map, HEADER.size + n * SECTION.size)
+            self._sections[name.rstrip(b"\0").decode("ascii")] = (offset, length)
+
+        self.meta = json.loads(bytes(self.section("meta")))
+        if self.meta["byteorder"] != sys.byteorder:
+            raise ValueError(f"{path} was built on a {self.meta['byteorder']}-endian machine")
+        self.size = self.meta["entries"]
+        self.text = self.section("text")
+        self._text_start = self._sections["text"][0]
+        self.text_offsets = self.section("text.offsets", "q")
+        self.fields = self.section("entries", "i")
+        self.values = self.section("values", "i")
+        self.fuzzy_names = self.section("fuzzy.names", "i")
+        self.fuzzy_counts = self.section("fuzzy.counts", "i")
+        self.name_lengths = self.section("name_lengths", "i")
+        self.postings = {name: _PostingsTable(self, name) for name in POSTINGS}
+
+    def section(self, name: str, item_format: str = None):
+        offset, length = self._sections[name]
+        view = self._view[offset:offset + length]
+        return view.cast(item_format) if item_format else view
+
+    def raw_string(self, string_id: int) -> bytes:
+        start = self._text_start
+        return self._map[start + self.text_offsets[string_id]:start + self.text_offsets[string_id + 1]]
+
+    def string(self, string_id: int) -> str:
+        return str(self.text[self.text_offsets[string_id]:self.text_offsets[string_id + 1]], "utf-8")
+
+    def record(self, entry_id: int) -> ConditionRecord:
+        values = []
+        row = entry_id * len(FIELDS) * 2
+        for n, field in enumerate(FIELDS):
+            start = self.fields[row + 2 * n]
+            count = self.fields[row + 2 * n + 1]
+            if count < 0:
+                values.append(None)
+            elif field in LIST_FIELDS:
+                values.append(tuple(self.string(s) for s in self.values[start:start + count]))
+            else:
+                values.append(self.string(self.values[start]))
+        return ConditionRecord.from_fields(values)
+
+    def fuzzy_name(self, entry_id: int) -> str:
+        return self.string(self.fuzzy_names[entry_id])
+
+    def entries(self) -> MappedRecords:
+        return MappedRecords(self)
+
+    def keyword_index(self) -> MappedKeywordIndex:
+        return MappedKeywordIndex(self)
+
+    def scanner(self) -> MappedScanner:
+        return MappedScanner(self)
+
+    def fuzzy_index(self) -> MappedFuzzyIndex:
+        return MappedFuzzyIndex(self)
+
+    def info(self) -> dict:
+        return {
+            "path": self.path,
+            "generation": self.generation,
+            "entries": self.size,
+            "bytes": len(self._map),
+            "strings": len(self.text_offsets) - 1,
+        }
+
+
+def main():
+    from .knowledge_store import KnowledgeStore
+
+    parser = argparse.ArgumentParser(description="Build or inspect the memory-mapped knowledge base index.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="fold the journal into the data file and write the index")
+    build.add_argument("--data", default="medical_data.json")
+    build.add_argument("--output", default="medical_data.kbidx")
+    show = commands.add_parser("info", help="print the header of an index file")
+    show.add_argument("path", nargs="?", default="medical_data.kbidx")
+    args = parser.parse_args()
+
+    if args.command == "info":
+        print(json.dumps(MappedIndex(args.path).info(), indent=2))
+        return
+
+    # Compacting and publishing under the store lock means no learned
+    # entry can land in between and be missed by both
+    published = []
+    store = KnowledgeStore(args.data, on_compact=lambda entries: published.append(write_index(entries, args.output)))
+    store.compact()
+    print(f"Wrote {args.output} (generation {published[0]}).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+import asyncio
+import itertools
+import threading
+
+from . import kb_index, metrics
+from .condition_scanner import ConditionScanner
+from .fuzzy_index import FuzzyIndex
+from .kb_index import MappedRecords
+from .layered_index import (LayeredEntries, LayeredFuzzyIndex, LayeredKeywordIndex, LayeredScanner,
+                            append_entries, shared_prefix)
+from .records import to_record
+from .search_index import KeywordIndex, tokenize
+
+# Above this share of edited entries, a full rebuild replaces patching
+INCREMENTAL_LIMIT = 0.1
+# Appended entries are layered over the indexes of the last full build;
+# past this many, a background rebuild folds them in
+MAX_LAYERED_ENTRIES = 256
+
+_versions = itertools.count(1)
+_write_lock = threading.Lock()  # Serializes writers; readers never lock
+_store_signature = None  # Store files as of our last load or write
+_folding = threading.Event()
+
+
+class KnowledgeBaseSnapshot:
+    """
+    Immutable, versioned view of the knowledge base plus every index
+    derived from it. A request reads one snapshot from start to finish;
+    changes build a new snapshot and swap it in, so readers never see a
+    half-updated knowledge base.
+    Snapshots made by appending share the indexes of their base snapshot
+    and only hold the appended entries in small layered indexes on top.
+    """
+
+    def __init__(self, entries, keyword_index, scanner, fuzzy_index,
+                 bm25_index=None, build_mode="full", base=None, generation=None):
+        self.version = next(_versions)
+        # Mapped and layered entries are shared rather than copied
+        self.entries = entries if isinstance(entries, (tuple, LayeredEntries, MappedRecords)) else tuple(entries)
+        self.keyword_index = keyword_index
+        self.scanner = scanner
+        self.fuzzy_index = fuzzy_index
+        self.build_mode = build_mode
+        self.base = self if base is None else base
+        # Generation of the index file the entries are mapped from, if any
+        self.generation = generation
+        self._bm25_index = bm25_index
+        self._batch_scorer = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def layered(self) -> int:
+        """
+        Number of entries appended since the base snapshot.
+        """
+        return len(self.entries) - len(self.base.entries)
+
+    @property
+    def bm25_index(self):
+        """
+        Built on first use; NumPy is only needed when BM25 ranking is on.
+        """
+        if self._bm25_index is None:
+            from .ranking import BM25Index, LayeredBM25
+            if self.base is self:
+                self._bm25_index = BM25Index(self.entries)
+            else:
+                start = len(self.base.entries)
+                self._bm25_index = LayeredBM25(self.base.bm25_index, self.entries[start:], start)
+        return self._bm25_index
+
+    @property
+    def batch_scorer(self):
+        if self._batch_scorer is None:
+            # Defers the NumPy/SciPy import
+            from .batch_scoring import BatchScorer, LayeredBatchScorer
+            if self.base is self:
+                self._batch_scorer = BatchScorer(self.keyword_index, len(self.entries))
+            else:
+                self._batch_scorer = LayeredBatchScorer(self.base.batch_scorer, self.keyword_index.delta,
+                                                        len(self.entries))
+        return self._batch_scorer
+
+    def has_condition(self, name: str) -> bool:
+        name_lower = name.lower()
+        ids = self.keyword_index.name_postings.get(tuple(tokenize(name)), ())
+        return any(self.entries[i].name_lower == name_lower for i in ids)
+
+    def info(self) -> dict:
+        info = {"version": self.version, "entries": len(self.entries), "build_mode": self.build_mode,
+                "layered_entries": self.layered}
+        if self.generation is not None:
+            info["index_generation"] = self.generation
+        return info
+
+
+def build_snapshot(entries, previous: KnowledgeBaseSnapshot = None) -> KnowledgeBaseSnapshot:
+    """
+    Builds a snapshot for entries. When previous is given and entries were
+    only appended, they are layered over its indexes; when a few were
+    edited in place, its indexes are copied and patched instead of rebuilt
+    from scratch.
+    """
+    if not isinstance(entries, LayeredEntries):
+        entries = [to_record(entry) for entry in entries]
+    if previous is not None:
+        snapshot = _build_incremental(entries, previous)
+        if snapshot is not None:
+            return snapshot
+    # Keep BM25 warm if the previous snapshot was using it
+    return _build_full(entries, warm_bm25=previous is not None and previous._bm25_index is not None)
+
+
+def _build_full(entries, warm_bm25=False):
+    with metrics.span("kb_full_build"):
+        return KnowledgeBaseSnapshot(
+            entries,
+            KeywordIndex(entries),
+            ConditionScanner(entries),
+            FuzzyIndex(entries),
+            bm25_index=_bm25_for(entries) if warm_bm25 else None,
+        )
+
+
+def _bm25_for(entries):
+    from .ranking import BM25Index
+    return BM25Index(entries)
+
+
+def _build_incremental(entries, previous):
+    old = previous.entries
+    if len(entries) < len(old):
+        return None # Removals shift ids; rebuild
+
+    start = shared_prefix(old, entries)
+    changed = [i for i in range(start, len(old)) if entries[i] is not old[i] and entries[i] != old[i]]
+    if not changed:
+        if len(entries) == len(old):
+            return previous
+        return _layer(previous, entries[len(old):])
+    if previous.generation is not None:
+        return None # Mapped entries can only be appended to; rebuild in memory
+    if len(changed) + len(entries) - len(old) > max(1, INCREMENTAL_LIMIT * len(entries)):
+        return None
+    return _patch(previous, entries, changed)
+
+
+def _layer(previous, appended):
+    """
+    Appends entries by adding them to layered indexes over the base
+    snapshot's, so the cost does not grow with the knowledge base.
+    """
+    with metrics.span("kb_incremental_build"):
+        keyword_index = LayeredKeywordIndex.over(previous.keyword_index)
+        scanner = LayeredScanner.over(previous.scanner)
+        fuzzy_index = LayeredFuzzyIndex.over(previous.fuzzy_index)
+        for entry_id, entry in enumerate(appended, len(previous.entries)):
+            for index in (keyword_index, scanner, fuzzy_index):
+                index.add(entry_id, entry)
+        return KnowledgeBaseSnapshot(
+            append_entries(previous.entries, appended), keyword_index, scanner, fuzzy_index,
+            build_mode="incremental", base=previous.base, generation=previous.generation,
+        )
+
+
+def _patch(previous, entries, changed):
+    """
+    Copies the base snapshot's indexes and patches the edited entries,
+    replaying any layered on top of it.
+    """
+    base = previous.base
+    old = previous.entries
+    with metrics.span("kb_incremental_build"):
+        keyword_index = base.keyword_index.copy()
+        scanner = base.scanner.copy()
+        fuzzy_index = base.fuzzy_index.copy()
+        bm25_index = base._bm25_index.copy() if base._bm25_index is not None else None
+        indexes = [keyword_index, scanner, fuzzy_index] + ([bm25_index] if bm25_index else [])
+
+        for i in changed:
+            if i < len(base.entries):
+                for index in indexes:
+                    index.remove(i, old[i])
+                    index.add(i, entries[i])
+        for i in range(len(base.entries), len(entries)):
+            for index in indexes:
+                index.add(i, entries[i])
+
+        # Reuse unchanged record objects so the next diff can compare by identity
+        changed_ids = set(changed)
+        merged = [old[i] if i not in changed_ids else entries[i] for i in range(len(old))]
+        merged.extend(entries[len(old):])
+        return KnowledgeBaseSnapshot(
+            merged, keyword_index, scanner, fuzzy_index, bm25_index, build_mode="incremental"
+        )
+
+
+_current = build_snapshot([])
+
+
+def current() -> KnowledgeBaseSnapshot:
+    """
+    The live snapshot. Callers should read this once per request and keep
+    using the returned object.
+    """
+    return _current
+
+
+def _publish(snapshot):
+    global _current
+    _current = snapshot # A single reference assignment, so the swap is atomic
+    # Mapped snapshots are folded by the next index build instead
+    if snapshot.generation is None and snapshot.layered >= MAX_LAYERED_ENTRIES and not _folding.is_set():
+        _folding.set()
+        threading.Thread(target=_fold, args=(snapshot,), daemon=True).start()
+
+
+def _fold(layered):
+    """
+    Rebuilds the indexes of a layered snapshot from scratch in the
+    background, then swaps the result in with whatever was appended in
+    the meantime layered on top of it.
+    """
+    try:
+        with metrics.span("kb_fold"):
+            folded = _build_full(tuple(layered.entries), warm_bm25=layered.base._bm25_index is not None)
+    except Exception as e:
+        print(f"Knowledge base fold failed, keeping layered indexes: {e}")
+        folded = None
+    with _write_lock:
+        _folding.clear() # Lets the publish below start the next fold if one is due
+        latest = _current
+        # Anything but further appends replaced the base; drop the fold
+        if folded is None or latest.base is not layered.base or latest.generation is not None:
+            return
+        appended = latest.entries[len(layered.entries):]
+        _publish(_layer(folded, appended) if appended else folded)
+    print(f"Folded {layered.layered} layered conditions into the knowledge base indexes.")
+
+
+def load(store) -> KnowledgeBaseSnapshot:
+    """
+    Builds a fresh snapshot from the store and swaps it in.
+    """
+    global _store_signature
+    with _write_lock:
+        snapshot = build_snapshot(store.load())
+        _store_signature = store.signature()
+        _publish(snapshot)
+    return snapshot
+
+
+def reload(store) -> KnowledgeBaseSnapshot:
+    """
+    Re-reads the store and swaps in a new snapshot, built incrementally
+    from the current one when only a few entries changed. Entries learned
+    while the store was being read are carried over.
+    """
+    base = _current
+    signature = store.signature()
+    return _swap_in(base, build_snapshot(store.load(), base), signature)
+
+
+def _swap_in(base, snapshot, signature):
+    global _store_signature
+    with _write_lock:
+        if _current is not base:
+            missing = [e for e in _current.entries[len(base.entries):]
+                       if not snapshot.has_condition(e.condition)]
+            if missing:
+                snapshot = build_snapshot(append_entries(snapshot.entries, missing), snapshot)
+        _store_signature = signature
+        _publish(snapshot)
+    return snapshot
+
+
+def _mapped_snapshot(path: str, store, base: KnowledgeBaseSnapshot = None) -> KnowledgeBaseSnapshot:
+    """
+    Snapshot over the index file at path (reusing base if it already maps
+    that generation), plus journaled entries the index does not have yet.
+    """
+    if base is None or base.generation != kb_index.read_generation(path):
+        index = kb_index.MappedIndex(path)
+        base = KnowledgeBaseSnapshot(index.entries(), index.keyword_index(), index.scanner(),
+                                     index.fuzzy_index(), build_mode="mapped", generation=index.generation)
+    learned = []
+    for entry in store.load_journal():
+        record = to_record(entry)
+        if not base.has_condition(record.condition) and all(
+                record.name_lower != other.name_lower for other in learned):
+            learned.append(record)
+    return build_snapshot(append_entries(base.entries, learned), base) if learned else base
+
+
+def load_index(path: str, store) -> KnowledgeBaseSnapshot:
+    """
+    Maps a prebuilt index file (see kb_index) instead of parsing the
+    store's base file, and swaps it in.
+    """
+    global _store_signature
+    with _write_lock:
+        signature = store.signature()
+        snapshot = _mapped_snapshot(path, store)
+        _store_signature = signature
+        _publish(snapshot)
+    return snapshot
+
+
+def reload_index(path: str, store) -> KnowledgeBaseSnapshot:
+    """
+    Remaps the index file if a new generation was published and picks up
+    newly journaled entries.
+    """
+    base = _current
+    signature = store.signature()
+    return _swap_in(base, _mapped_snapshot(path, store, base), signature)
+
+
+def learn(store, entry) -> bool:
+    """
+    Persists a new condition and publishes a snapshot that includes it.
+    Returns False if a condition with that name is already known.
+    """
+    global _store_signature
+    record = to_record(entry)
+    with _write_lock:
+        snapshot = _current
+        if snapshot.has_condition(record.condition):
+            return False
+        try:
+            with metrics.span("kb_persist"):
+                store.append(record.to_dict())
+            _store_signature = store.signature()
+        except Exception as e:
+            print(f"Could not save learned data: {e}")
+        _publish(build_snapshot(append_entries(snapshot.entries, [record]), snapshot))
+    return True
+
+
+async def watch(store, interval: float, index_path: str = None):
+    """
+    Polls the store files and hot-reloads the knowledge base when they are
+    changed by someone else (an edit, or another worker learning). With
+    index_path, also maps the index file once it is built and remaps it
+    whenever a new generation of it is published.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            generation = kb_index.read_generation(index_path) if index_path else 0
+            # Generation 0: no index file (yet); keep serving the store
+            if store.signature() == _store_signature and generation in (0, _current.generation):
+                continue
+            if generation:
+                snapshot = await asyncio.to_thread(reload_index, index_path, store)
+            else:
+                snapshot = await asyncio.to_thread(reload, store)
+            print(f"Reloaded knowledge base: version {snapshot.version}, "
+                  f"{len(snapshot)} conditions ({snapshot.build_mode}).")
+        except Exception as e:
+            print(f"Knowledge base reload failed, keeping version {_current.version}: {e}")
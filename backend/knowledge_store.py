@@ -0,0 +1,167 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl  # POSIX only; Windows falls back to the in-process lock
+except ImportError:
+    fcntl = None
+
+# Fold the journal back into the base file once it holds this many entries
+COMPACT_AFTER = 200
+
+
+class KnowledgeStore:
+    """
+    Persists the knowledge base as a JSON base file plus an append-only
+    JSONL journal of learned conditions.
+    Learning a condition appends one line instead of rewriting the whole
+    base file. The journal is folded back into the base file (compaction)
+    with an atomic rename once it grows past compact_after entries.
+    on_compact(entries), if given, is called with the compacted entries
+    before the journal is emptied, e.g. to publish a prebuilt index. A
+    failed compaction is logged and retried after another compact_after
+    appends; the appended entries are saved either way.
+    """
+
+    def __init__(self, path: str, journal_path: str = None, compact_after: int = COMPACT_AFTER,
+                 on_compact=None):
+        self.path = path
+        self.journal_path = journal_path or os.path.splitext(path)[0] + ".journal.jsonl"
+        self.compact_after = compact_after
+        self.on_compact = on_compact
+        self._lock = threading.Lock()
+        self._journal_entries = self._count_journal()
+        self._next_compaction = compact_after
+
+    @contextmanager
+    def _locked(self, exclusive: bool = True):
+        """
+        Serializes access between threads, and between worker processes
+        where flock is available.
+        """
+        with self._lock:
+            fd = os.open(self.journal_path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                if fcntl:
+                    fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                yield fd
+            finally:
+                os.close(fd)  # Also releases the flock
+
+    def signature(self) -> tuple:
+        """
+        Modification time and size of the base file and journal.
+        Changes whenever either file is written.
+        """
+        parts = []
+        for path in (self.path, self.journal_path):
+            try:
+                stat = os.stat(path)
+                parts.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                parts.append(None)
+        return tuple(parts)
+
+    def load(self) -> list:
+        """
+        Returns the base entries followed by journaled ones.
+        A torn last line from a crash mid-append is skipped, and journal
+        entries already present in the base file are ignored, so a crash
+        during compaction cannot duplicate them.
+        """
+        with self._locked(exclusive=False):
+            entries = self._read_base()
+            journal = self._read_journal()
+
+        self._journal_entries = len(journal)
+        known = {entry["condition"] for entry in entries}
+        for entry in journal:
+            if entry["condition"] not in known:
+                known.add(entry["condition"])
+                entries.append(entry)
+        return entries
+
+    def load_journal(self) -> list:
+        """
+        Returns only the journaled entries, skipping the base file.
+        """
+        with self._locked(exclusive=False):
+            journal = self._read_journal()
+        self._journal_entries = len(journal)
+        return journal
+
+    def _count_journal(self) -> int:
+        if not os.path.exists(self.journal_path):
+            return 0
+        with open(self.journal_path, "rb") as f:
+            return sum(1 for line in f if line.strip())
+
+    def _read_base(self) -> list:
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, "r") as f:
+            return json.load(f)
+
+    def _read_journal(self) -> list:
+        entries = []
+        if not os.path.exists(self.journal_path):
+            return entries
+        with open(self.journal_path, "r") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    print(f"Skipping unreadable journal line in {self.journal_path}")
+        return entries
+
+    def append(self, entry: dict):
+        """
+        Durably appends one learned entry to the journal.
+        """
+        line = (json.dumps(entry) + "\n").encode("utf-8")
+        with self._locked() as fd:
+            # Start a fresh line if a crash left a torn one behind
+            if os.lseek(fd, 0, os.SEEK_END) > 0:
+                os.lseek(fd, -1, os.SEEK_END)
+                if os.read(fd, 1) != b"\n":
+                    line = b"\n" + line
+            # A single O_APPEND write keeps lines from different writers apart
+            os.write(fd, line)
+            os.fsync(fd)
+        self._journal_entries += 1
+        if self._journal_entries >= self._next_compaction:
+            try:
+                self.compact()
+            except Exception as e: # pylint: disable=broad-exception-caught
+                # The entry is already in the journal; compaction can wait
+                self._next_compaction = self._journal_entries + self.compact_after
+                print(f"Could not compact knowledge base journal into {self.path}: {e}")
+
+    def compact(self):
+        """
+        Rewrites the base file with all journaled entries and empties the
+        journal. The new base file replaces the old one atomically.
+        """
+        with self._locked() as fd:
+            base = self._read_base()
+            known = {entry["condition"] for entry in base}
+            for entry in self._read_journal():
+                if entry["condition"] not in known:
+                    known.add(entry["condition"])
+                    base.append(entry)
+
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(base, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            if self.on_compact is not None:
+                self.on_compact(base)
+            os.ftruncate(fd, 0)
+            os.fsync(fd)
+        self._journal_entries = 0
+        self._next_compaction = self.compact_after
+        print(f"Compacted knowledge base journal into {self.path} ({len(base)} conditions).")
@@ -0,0 +1,194 @@
+from collections.abc import Mapping, Sequence
+
+from .condition_scanner import ConditionScanner
+from .fuzzy_index import FuzzyIndex, normalize_name
+from .records import to_record
+from .search_index import KeywordIndex
+
+
+class LayeredEntries(Sequence):
+    """
+    A frozen sequence of entries plus the entries appended since.
+    Appending copies only the appended part, never the base.
+    """
+
+    def __init__(self, base, extra: tuple = ()):
+        self.base = base
+        self.extra = extra
+
+    def __len__(self):
+        return len(self.base) + len(self.extra)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return tuple(self[i] for i in range(*position.indices(len(self))))
+        position = int(position)
+        if position < 0:
+            position += len(self)
+        if position < len(self.base):
+            return self.base[position]
+        return self.extra[position - len(self.base)]
+
+    def __iter__(self):
+        yield from self.base
+        yield from self.extra
+
+    def __add__(self, other):
+        return LayeredEntries(self.base, self.extra + tuple(to_record(entry) for entry in other))
+
+
+def append_entries(entries, more):
+    """
+    entries followed by more, sharing entries instead of copying it.
+    """
+    if isinstance(entries, LayeredEntries):
+        return entries + more
+    return LayeredEntries(entries, tuple(to_record(entry) for entry in more))
+
+
+def shared_prefix(old, new) -> int:
+    """
+    Number of leading entries new is known to share with old without
+    comparing them: the frozen base both were appended to.
+    """
+    if isinstance(new, LayeredEntries):
+        if new.base is old or (isinstance(old, LayeredEntries) and old.base is new.base):
+            return len(new.base)
+    return 0
+
+
+class LayeredPostings(Mapping):
+    """
+    Postings of a frozen base index with those of a small delta index on
+    top. Behaves like the postings dict of a single index.
+    """
+
+    def __init__(self, base, delta: dict):
+        self.base = base
+        self.delta = delta
+
+    def get(self, key, default=None):
+        ids = self.base.get(key)
+        extra = self.delta.get(key)
+        if not extra:
+            return default if ids is None else ids
+        # Layered entries have the highest ids, so the result stays sorted
+        return list(ids) + extra if ids is not None else extra
+
+    def __getitem__(self, key):
+        ids = self.get(key)
+        if ids is None:
+            raise KeyError(key)
+        return ids
+
+    def __iter__(self):
+        yield from self.base
+        for key in self.delta:
+            if self.base.get(key) is None:
+                yield key
+
+    def __len__(self):
+        return len(self.base) + sum(1 for key in self.delta if self.base.get(key) is None)
+
+
+class LayeredColumn:
+    """
+    Per-entry values: the delta's for layered entries, else the base's.
+    """
+
+    def __init__(self, base, delta: dict):
+        self.base = base
+        self.delta = delta
+
+    def __getitem__(self, entry_id):
+        if entry_id in self.delta:
+            return self.delta[entry_id]
+        return self.base[entry_id]
+
+
+class LayeredKeywordIndex(KeywordIndex):
+    """
+    KeywordIndex made of a frozen base index and a delta index holding
+    the entries added since. Copies and additions only touch the delta,
+    so their cost does not grow with the knowledge base.
+    """
+
+    def __init__(self, base: KeywordIndex, delta: KeywordIndex = None):  # pylint: disable=super-init-not-called
+        self.base = base
+        self.delta = delta or KeywordIndex()
+        self.name_postings = LayeredPostings(base.name_postings, self.delta.name_postings)
+        self.keyword_postings = LayeredPostings(base.keyword_postings, self.delta.keyword_postings)
+        self.max_name_len = max(base.max_name_len, self.delta.max_name_len)
+        self.max_keyword_len = max(base.max_keyword_len, self.delta.max_keyword_len)
+
+    @classmethod
+    def over(cls, index):
+        """
+        A layered copy of index that can be added to without changing it.
+        """
+        return index.copy() if isinstance(index, cls) else cls(index)
+
+    def add(self, entry_id: int, entry: dict):
+        self.delta.add(entry_id, entry)
+        self.max_name_len = max(self.max_name_len, self.delta.max_name_len)
+        self.max_keyword_len = max(self.max_keyword_len, self.delta.max_keyword_len)
+
+    def copy(self):
+        return LayeredKeywordIndex(self.base, self.delta.copy())
+
+
+class LayeredFuzzyIndex(FuzzyIndex):
+    """
+    FuzzyIndex over a frozen base plus a delta of the entries added since.
+    """
+
+    def __init__(self, base: FuzzyIndex, delta: FuzzyIndex = None):  # pylint: disable=super-init-not-called
+        self.base = base
+        self.delta = delta or FuzzyIndex()
+        self.postings = LayeredPostings(base.postings, self.delta.postings)
+        self.names = LayeredColumn(base.names, self.delta.names)
+        self.trigram_counts = LayeredColumn(base.trigram_counts, self.delta.trigram_counts)
+
+    @classmethod
+    def over(cls, index):
+        return index.copy() if isinstance(index, cls) else cls(index)
+
+    def has_name(self, name: str) -> bool:
+        return self.base.has_name(name) or self.delta.has_name(name)
+
+    def add(self, entry_id: int, entry: dict):
+        if not self.base.has_name(normalize_name(entry["condition"])):
+            self.delta.add(entry_id, entry)
+
+    def copy(self):
+        return LayeredFuzzyIndex(self.base, self.delta.copy())
+
+
+class LayeredScanner(ConditionScanner):
+    """
+    ConditionScanner over a frozen base plus a delta of the names added
+    since. At each position the longer match of the two wins; on a tie
+    the base name was registered first, as in a single trie.
+    """
+
+    def __init__(self, base: ConditionScanner, delta: ConditionScanner = None):  # pylint: disable=super-init-not-called
+        self.base = base
+        self.delta = delta or ConditionScanner()
+        self.name_lengths = LayeredColumn(base.name_lengths, self.delta.name_lengths)
+
+    @classmethod
+    def over(cls, index):
+        return index.copy() if isinstance(index, cls) else cls(index)
+
+    def add(self, entry_id: int, entry: dict):
+        self.delta.add(entry_id, entry)
+
+    def copy(self):
+        return LayeredScanner(self.base, self.delta.copy())
+
+    def longest_match(self, tokens: list, start: int, cache: dict = None):
+        match_id, match_end = self.base.longest_match(tokens, start, cache)
+        delta_id, delta_end = self.delta.longest_match(tokens, start)
+        if delta_end > match_end:
+            return delta_id, delta_end
+        return match_id, match_end
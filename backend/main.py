@@ -1,19 +1,65 @@
+from . import startup # Must come first: marks the process start time
 import os
-import json
-import time
+import asyncio
 import random
-import difflib
-from fastapi import FastAPI, UploadFile, File
+import time
+import zlib
+from fastapi import FastAPI, UploadFile, File, Request, HTTPException
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from starlette.routing import Match
+from contextlib import aclosing, asynccontextmanager
+from pydantic import BaseModel, Field
 from typing import List
+from . import metrics
 from . import web_bridge # Custom Live Search Module
-from .pdf_processor import extract_text_from_pdf
+from . import pdf_processor
+from . import image_processor
+from . import knowledge_base
+from .result_cache import ResultCache, normalize_input
+from . import upload_cache
+from .upload_cache import UploadCache
+from .enrichment import EnrichmentQueue
+from .search_index import tokenize
+from .knowledge_store import KnowledgeStore
+from .kb_index import write_index
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    with startup.phase("load_knowledge_base"):
+        load_data()
+    if image_processor.model_configured():
+        try:
+            with startup.phase("load_image_model"):
+                await asyncio.to_thread(image_processor.load_model)
+            image_processor.start_inference()
+        except Exception as e:
+            print(f"Could not load image model, matching images by filename: {e}")
+    startup.mark_ready()
+    ENRICHMENT.start()
+    background = [
+        asyncio.create_task(metrics.monitor_event_loop_lag()),
+        asyncio.create_task(startup.warm_up()),
+        asyncio.create_task(pdf_processor.warm_pool()),
+    ]
+    if KB_WATCH_INTERVAL > 0:
+        background.append(asyncio.create_task(
+            knowledge_base.watch(KNOWLEDGE_STORE, KB_WATCH_INTERVAL, KB_INDEX_FILE or None)
+        ))
+    yield
+    for task in background:
+        task.cancel()
+    pdf_processor.shutdown_pool()
+    await image_processor.stop_inference()
+    await ENRICHMENT.stop()
+    # Release pooled connections to the NHS site
+    await web_bridge.close_client()
 
 app = FastAPI(
     title="Rural Clinical AI Assistant API",
     description="Backend API with Real-Time Web Bridge",
-    version="0.4.0"
+    version="0.4.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -24,6 +70,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def route_label(request: Request) -> str:
+    """
+    The path template of the route a request matches, so metric labels stay
+    bounded whatever paths clients send.
+    """
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    with metrics.track_request(route_label(request)):
+        return await call_next(request)
+
+metrics.register_gauges("rural_ai_web_cache", web_bridge.cache_stats)
+metrics.register_gauges("rural_ai_startup_seconds", lambda: startup.PHASES)
+metrics.register_gauges("rural_ai_kb", lambda: knowledge_base.current().info())
+metrics.register_gauges("rural_ai_inference", image_processor.inference_stats)
+metrics.register_gauges("rural_ai_result_cache", lambda: RESULT_CACHE.stats())
+metrics.register_gauges("rural_ai_upload_cache", lambda: UPLOAD_CACHE.stats())
+metrics.register_gauges("rural_ai_enrichment", lambda: ENRICHMENT.stats())
+
 class AnalysisResponse(BaseModel):
     risk_level: str
     probable_condition: str
@@ -37,31 +107,85 @@ class AnalysisResponse(BaseModel):
 
 # --- Load Knowledge Base ---
 MEDICAL_DATA_FILE = "medical_data.json"
-MEDICAL_DATA = []
+# Prebuilt index (python -m backend.kb_index build) that workers map read-only
+# and share instead of each parsing MEDICAL_DATA_FILE; empty disables it
+KB_INDEX_FILE = os.environ.get("KB_INDEX_FILE", "")
+# With an index, compacting the journal also republishes the index
+KNOWLEDGE_STORE = KnowledgeStore(
+    MEDICAL_DATA_FILE,
+    on_compact=(lambda entries: write_index(entries, KB_INDEX_FILE)) if KB_INDEX_FILE else None,
+)
+# Seconds between checks for edits to the knowledge base files (0 disables)
+KB_WATCH_INTERVAL = float(os.environ.get("KB_WATCH_INTERVAL", "5"))
+
+# "bm25" ranks local matches with BM25 instead of counting keyword hits
+RANKING_MODE = os.environ.get("RANKING_MODE", "keywords")
+# BM25 matches scoring below this are treated as no match (e.g. only stopwords hit)
+BM25_MIN_SCORE = 1.0
+
+# Minimum name similarity (0-1) for the fuzzy fallback to accept a match
+FUZZY_CUTOFF = 0.4
+FUZZY_MATCH_SCORE = 0.8 # Score reported for fuzzy matches (keyword scores are >= 1)
+
+# Longest a request waits on the live web before answering from local data;
+# the lookup itself carries on in the background and is learned when it lands
+LATENCY_BUDGET = float(os.environ.get("LATENCY_BUDGET", "2.0"))
+
+# Image model predictions below this confidence fall back to the filename
+IMAGE_CONFIDENCE_THRESHOLD = 0.6
+
+# Stop reading a report once one condition has this many mentions and
+# leads the runner-up by this factor
+EARLY_EXIT_MIN_MENTIONS = 3
+EARLY_EXIT_MARGIN = 2.0
+
+# Batch symptom analysis limits
+MAX_BATCH_SIZE = 1000
+
+# Finished responses for repeated inputs; emptied whenever the knowledge base changes
+RESULT_CACHE = ResultCache()
+# Report text and image predictions by upload content, so a retried upload
+# is not parsed or decoded again
+UPLOAD_CACHE = UploadCache()
+# "deterministic" picks response templates by hashing the input, so the same
+# input always gets the same wording; "random" varies it per request
+TEMPLATE_MODE = os.environ.get("TEMPLATE_MODE", "deterministic")
+
+def built_index_path():
+    """
+    KB_INDEX_FILE if it is set and has been built, else None.
+    """
+    return KB_INDEX_FILE if KB_INDEX_FILE and os.path.exists(KB_INDEX_FILE) else None
 
 def load_data():
-    global MEDICAL_DATA
     try:
-        with open(MEDICAL_DATA_FILE, "r") as f:
-            MEDICAL_DATA = json.load(f)
-        print(f"Loaded {len(MEDICAL_DATA)} conditions from knowledge base.")
+        if built_index_path():
+            kb = knowledge_base.load_index(KB_INDEX_FILE, KNOWLEDGE_STORE)
+            print(f"Mapped {len(kb)} conditions from {KB_INDEX_FILE} "
+                  f"(generation {kb.generation}, version {kb.version}).")
+        else:
+            if KB_INDEX_FILE:
+                print(f"{KB_INDEX_FILE} not found, loading {MEDICAL_DATA_FILE} until it is built.")
+            kb = knowledge_base.load(KNOWLEDGE_STORE)
+            print(f"Loaded {len(kb)} conditions from knowledge base (version {kb.version}).")
     except Exception as e:
         print(f"Error loading medical data: {e}")
-        MEDICAL_DATA = []
-
-load_data()
+        return
+    if RANKING_MODE == "bm25":
+        kb.bm25_index # Build it now rather than on the first request
 
-def save_new_data(new_entry):
-    global MEDICAL_DATA
-    MEDICAL_DATA.append(new_entry)
-    try:
-        with open(MEDICAL_DATA_FILE, "w") as f:
-            json.dump(MEDICAL_DATA, f, indent=2)
+def save_new_data(new_entry) -> bool:
+    if knowledge_base.learn(KNOWLEDGE_STORE, new_entry):
         print(f"Automatically learned new condition: {new_entry['condition']}")
-    except Exception as e:
-        print(f"Could not save learned data: {e}")
+        return True
+    return False
 
 # --- Generative Logic Engine ---
+def choose_template(templates: list, *key):
+    if TEMPLATE_MODE == "random":
+        return random.choice(templates)
+    return templates[zlib.crc32("|".join(key).encode("utf-8")) % len(templates)]
+
 def generate_dynamic_response(query: str, match_data: dict, input_type: str):
     """
     Constructs a unique response based on the specific input query and the matched condition.
@@ -89,7 +213,8 @@ def generate_dynamic_response(query: str, match_data: dict, input_type: str):
         final_explanation = f"LIVE WEB RESULT: {match_data['explanation']}"
     else:
         final_explanation = (
-            random.choice(explanation_templates) + " " + match_data["explanation"] + nuance
+            choose_template(explanation_templates, query, condition, input_type)
+            + " " + match_data["explanation"] + nuance
         )
 
     # 2. Dynamic Risk Assessment
@@ -111,97 +236,211 @@ def generate_dynamic_response(query: str, match_data: dict, input_type: str):
         "disease_stage": match_data.get("stage", "Clinical Presentation"),
         "detailed_explanation": final_explanation,
         "treatment_guidance": match_data.get("treatment_guidance", "Consult GP"),
-        "medications": match_data.get("medications", []),
-        "patient_dos": match_data.get("dos", []),
-        "patient_donts": match_data.get("donts", []),
+        "medications": list(match_data.get("medications", [])),
+        "patient_dos": list(match_data.get("dos", [])),
+        "patient_donts": list(match_data.get("donts", [])),
         "referral_recommendation": match_data.get("referral", "Refer to GP")
     }
 
 # --- Helper: Search Algorithm ---
-def find_best_match(query: str):
+def find_local_match(query: str, kb=None):
+    """
+    Searches the local knowledge base only.
+    Returns (entry, score), or (None, 0) if nothing matched.
+    """
+    if kb is None:
+        kb = knowledge_base.current()
     query = query.lower()
     best_match = None
     max_score = 0.0
     
-    # 1. Direct Keyword Counting
-    for condition in MEDICAL_DATA:
-        if condition["condition"].lower() in query:
-             return condition, 1.0 # Perfect match
-             
-        score = 0
-        if len(condition["keywords"]) == 0: continue
-        
-        for keyword in condition["keywords"]:
-            if keyword.lower() in query:
-                score += 1
-        
-        if score > max_score:
-            max_score = score
-            best_match = condition
+    # 1. Indexed Keyword Counting
+    with metrics.span("keyword_scoring"):
+        tokens = tokenize(query)
+        name_id = kb.keyword_index.match_name(tokens)
+        if name_id is None and RANKING_MODE == "bm25":
+            ranked = kb.bm25_index.search(tokens, k=1, min_score=BM25_MIN_SCORE)
+            best_id, max_score = ranked[0] if ranked else (None, 0)
+        elif name_id is None:
+            best_id, max_score = kb.keyword_index.best_keyword_match(tokens)
+
+    if name_id is not None:
+        return kb.entries[name_id], 1.0 # Perfect match
+    if best_id is not None:
+        best_match = kb.entries[best_id]
 
     # 2. Fuzzy Matching fallback
     if max_score == 0:
-        condition_names = [c["condition"] for c in MEDICAL_DATA]
-        matches = difflib.get_close_matches(query, condition_names, n=1, cutoff=0.4)
+        with metrics.span("fuzzy_fallback"):
+            matches = kb.fuzzy_index.search(query, k=1, cutoff=FUZZY_CUTOFF)
         if matches:
-            for c in MEDICAL_DATA:
-                if c["condition"] == matches[0]:
-                    return c, 0.8
+            return kb.entries[matches[0][0]], FUZZY_MATCH_SCORE
 
-    # 3. LIVE WEB FALLBACK (Aggressive)
-    # If we don't have a PERFECT local match, try the web to get the best real-time data.
-    if max_score < 1.0:
-        print(f"Local confidence low ({max_score}). Attempting Live Web Search for '{query}'...")
-        web_result = web_bridge.get_live_nhs_data(query)
-        if web_result:
-            # Check if we already have this condition to avoid duplicates
-            exists = False
-            for c in MEDICAL_DATA:
-                if c["condition"] == web_result["condition"]:
-                    exists = True
-                    break
-            
-            if not exists:
-                save_new_data(web_result)
-                return web_result, 1.0
-            else:
-                # If it existed but keyword matching failed, return the found web result anyway
-                return web_result, 1.0
+    return best_match, max_score
 
-    if max_score == 0:
+# Live web lookups run here, off the request path
+ENRICHMENT = EnrichmentQueue(
+    lambda query: web_bridge.get_live_nhs_data_async(query),
+    save_new_data,
+)
+
+async def wait_for_enrichment(query: str, budget: float):
+    """
+    Queues a web lookup for query and waits for it for at most budget
+    seconds. Returns (entry, score), or (None, 0) if nothing was found in
+    time or the lookup queue is full.
+    """
+    future = ENRICHMENT.submit(query)
+    if future is None:
+        print(f"Web lookup queue is full. Answering '{query}' from local data only.")
         return None, 0.0
+    try:
+        with metrics.span("web_bridge"):
+            # shield: other requests may be waiting on the same lookup
+            outcome = await asyncio.wait_for(asyncio.shield(future), max(0.0, budget))
+    except asyncio.TimeoutError:
+        metrics.increment("rural_ai_latency_budget_exceeded_total")
+        print(f"Web lookup for '{query}' is over the latency budget; finishing it in the background.")
+        return None, 0.0
+    # Also when the condition was already known but keyword matching missed it
+    return (outcome, 1.0) if outcome else (None, 0.0)
+
+async def find_best_match_async(query: str, budget: float = None):
+    """
+    Finds the best local match; when there is none, the live web fallback
+    runs on the background enrichment queue and is only awaited within the
+    latency budget. Weak (fuzzy) local matches are answered immediately and
+    looked up in the background so later queries get the real page.
+    """
+    started = time.perf_counter()
+    if budget is None:
+        budget = LATENCY_BUDGET
+    query = query.lower()
+    best_match, max_score = find_local_match(query)
+
+    if best_match is None:
+        print(f"Local confidence low ({max_score}). Attempting Live Web Search for '{query}'...")
+        return await wait_for_enrichment(query, budget - (time.perf_counter() - started))
+
+    if max_score == FUZZY_MATCH_SCORE:
+        ENRICHMENT.submit(query)
 
     return best_match, max_score
 
-def find_condition_in_text(text: str):
+def match_batch_locally(queries: List[str], kb):
     """
-    Scans a large text block for known conditions.
-    Returns the best matching condition entry or None.
+    The local part of find_best_matches_batch, for a worker thread.
+    Keyword scoring for the whole batch is one sparse matrix product.
+    Returns (results, indexes of the queries nothing local matched).
     """
-    text = text.lower()
-    best_match = None
-    max_count = 0
-    
-    for entry in MEDICAL_DATA:
-        condition = entry["condition"]
-        # Efficiency: Check if condition is in text
-        if condition.lower() in text:
-            # Count occurrences to find most relevant topic
-            count = text.count(condition.lower())
-            
-            # Heuristic: Prefer more frequent mentions
-            if count > max_count:
-                max_count = count
-                best_match = entry
-            elif count == max_count and count > 0:
-                # Tie-breaker: Prefer longer/more specific names
-                # e.g. "Type 2 Diabetes" over "Diabetes" if both appear once (unlikely but possible)
-                if best_match and len(condition) > len(best_match["condition"]):
-                    best_match = entry
-                elif not best_match:
-                     best_match = entry
-                     
-    return best_match
+    token_lists = [tokenize(q) for q in queries]
+    results = [(None, 0.0)] * len(queries)
+
+    name_ids = [kb.keyword_index.match_name(tokens) for tokens in token_lists]
+    with metrics.span("keyword_scoring"):
+        if RANKING_MODE == "bm25":
+            # A BM25 query is already a few vectorized additions; rank the
+            # queries without a name match one by one, as find_local_match does
+            best = [(kb.bm25_index.search(tokens, k=1, min_score=BM25_MIN_SCORE) or [(-1, 0.0)])[0]
+                    if name_id is None else (-1, 0.0)
+                    for tokens, name_id in zip(token_lists, name_ids)]
+        else:
+            best_ids, best_scores = kb.batch_scorer.best_keyword_matches(token_lists)
+            best = list(zip(best_ids.tolist(), best_scores.tolist()))
+
+    unresolved = []
+    for i, name_id in enumerate(name_ids):
+        best_id, best_score = best[i]
+        if name_id is not None:
+            results[i] = (kb.entries[name_id], 1.0)
+        elif best_id >= 0:
+            results[i] = (kb.entries[best_id], best_score)
+        else:
+            with metrics.span("fuzzy_fallback"):
+                matches = kb.fuzzy_index.search(queries[i], k=1, cutoff=FUZZY_CUTOFF)
+            if matches:
+                results[i] = (kb.entries[matches[0][0]], FUZZY_MATCH_SCORE)
+            else:
+                unresolved.append(i)
+    return results, unresolved
+
+async def find_best_matches_batch(queries: List[str], kb=None):
+    """
+    Batch version of find_best_match_async.
+    Local scoring for the whole batch runs in a worker thread, so other
+    requests are served meanwhile; the web fallback for unresolved
+    queries runs on the enrichment queue.
+    """
+    if kb is None:
+        kb = knowledge_base.current()
+    queries = [q.lower() for q in queries]
+    results, unresolved = await asyncio.to_thread(match_batch_locally, queries, kb)
+
+    if unresolved:
+        # Duplicate queries share one lookup; all of them share one latency budget
+        pending = {queries[i]: ENRICHMENT.submit(queries[i]) for i in unresolved}
+        futures = [future for future in pending.values() if future is not None]
+        if futures:
+            with metrics.span("web_bridge"):
+                await asyncio.wait(futures, timeout=LATENCY_BUDGET)
+        for i in unresolved:
+            future = pending[queries[i]]
+            if future is not None and future.done() and future.result():
+                results[i] = (future.result(), 1.0)
+
+    return results
+
+async def find_condition_in_pdf(file: UploadFile, kb=None):
+    """
+    Streams report pages from the PDF parsing pool and counts condition
+    mentions page by page. Stops parsing as soon as one condition clearly
+    dominates. Returns the best matching entry or None.
+    The upload is hashed while it is spooled; a report seen before is
+    matched from its cached text without being parsed again.
+    """
+    if kb is None:
+        kb = knowledge_base.current()
+    digest = upload_cache.content_hash()
+    with metrics.span("upload_read"):
+        path = await pdf_processor.spool_upload(file, digest=digest)
+    digest = digest.hexdigest()
+
+    cached = await UPLOAD_CACHE.get_async("report", digest)
+    if cached is not None:
+        pdf_processor.remove_spooled(path)
+        print("Report seen before; matching its cached text.")
+        return find_condition_in_text(cached["text"], kb)
+
+    counts = {}
+    texts = []
+    async with aclosing(pdf_processor.iter_spooled_pages(path)) as pages:
+        async for page_text in pages:
+            texts.append(page_text)
+            with metrics.span("report_scan"):
+                kb.scanner.merge_counts(counts, kb.scanner.count(page_text))
+            if kb.scanner.is_confident(counts, EARLY_EXIT_MIN_MENTIONS, EARLY_EXIT_MARGIN):
+                print(f"Confident match after {len(texts)} page(s); skipping the rest.")
+                break
+    # Only the pages that were read: enough to reach the same match again
+    UPLOAD_CACHE.set("report", digest, {"text": "".join(texts)})
+
+    best_id = kb.scanner.best(counts)
+    if best_id is None:
+        return None
+    return kb.entries[best_id]
+
+def find_condition_in_text(text: str, kb=None):
+    """
+    Scans a large text block for known conditions in a single pass.
+    Returns the most frequently mentioned condition entry or None.
+    """
+    if kb is None:
+        kb = knowledge_base.current()
+    with metrics.span("report_scan"):
+        best_id = kb.scanner.best_match(text)
+    if best_id is None:
+        return None
+    return kb.entries[best_id]
 
 # --- Fallback Response ---
 UNKNOWN_RESPONSE = {
@@ -213,7 +452,7 @@ UNKNOWN_RESPONSE = {
         "Please visit the closest medical facility."
     ),
     "treatment_guidance": "Consult a doctor immediately for proper diagnosis.",
-
+    "medications": [],
     "patient_dos": ["Monitor symptoms", "Visit nearest clinic"],
     "patient_donts": ["Do not ignore worsening symptoms"],
     "referral_recommendation": "Refer to General Physician (GP) for diagnosis."
@@ -223,31 +462,164 @@ UNKNOWN_RESPONSE = {
 def read_root():
     return {"message": "Rural Clinical AI Assistant (Web-Connected) is Online"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(
+        metrics.render_prometheus(),
+        media_type="text/plain; version=0.0.4"
+    )
+
+@app.get("/startup-report")
+def startup_report():
+    return startup.report()
+
+@app.post("/admin/reload-kb")
+async def reload_knowledge_base():
+    """
+    Rebuilds the knowledge base from disk in the background and swaps it in.
+    """
+    index_path = built_index_path()
+    if index_path:
+        snapshot = await asyncio.to_thread(knowledge_base.reload_index, index_path, KNOWLEDGE_STORE)
+    else:
+        snapshot = await asyncio.to_thread(knowledge_base.reload, KNOWLEDGE_STORE)
+    return snapshot.info()
+
+@app.get("/web-cache/stats")
+def web_cache_stats():
+    return web_bridge.cache_stats()
+
+@app.get("/enrichment/stats")
+def enrichment_stats():
+    return ENRICHMENT.stats()
+
+@app.get("/upload-cache/stats")
+def upload_cache_stats():
+    return UPLOAD_CACHE.stats()
+
+@app.get("/result-cache/stats")
+def result_cache_stats():
+    return RESULT_CACHE.stats()
+
+async def predict_image(file: UploadFile) -> dict:
+    """
+    Image model prediction for an upload, cached by its content.
+    Hashing streams over the already spooled upload, so it is not
+    buffered again, and a cache hit skips decoding entirely.
+    """
+    digest = await asyncio.to_thread(upload_cache.hash_file, file.file)
+    # Predictions are only valid for the model that made them
+    kind = f"image:{image_processor.IMAGE_MODEL_PATH}"
+    prediction = await UPLOAD_CACHE.get_async(kind, digest)
+    if prediction is None:
+        prediction = await image_processor.process_image(file)
+        UPLOAD_CACHE.set(kind, digest, prediction)
+    return prediction
+
 @app.post("/analyze-image", response_model=AnalysisResponse)
 async def analyze_image(file: UploadFile = File(...)):
     filename = file.filename.lower()
     # Remove file extension for query
     query = os.path.splitext(filename)[0]
+
+    if image_processor.inference_ready():
+        try:
+            prediction = await predict_image(file)
+            print(f"Image model predicts {prediction['condition']} ({prediction['confidence']})")
+            if prediction["confidence"] >= IMAGE_CONFIDENCE_THRESHOLD:
+                query = prediction["condition"]
+        except asyncio.QueueFull:
+            print("Image model is busy. Falling back to filename...")
+        except Exception as e:
+            print(f"Error during image analysis: {e}")
+
+    query = normalize_input(query)
+    kb = knowledge_base.current()
+    response = RESULT_CACHE.get("image", query, kb.version)
+    if response is None:
+        match, score = await find_best_match_async(query)
+        if not match:
+            response = UNKNOWN_RESPONSE
+        else:
+            with metrics.span("generate_response"):
+                response = generate_dynamic_response(query, match, "image")
+            RESULT_CACHE.set("image", query, kb.version, response)
     
-    match, score = find_best_match(query)
-    
-    time.sleep(1.5)
+    with metrics.span("response_delay"):
+        await asyncio.sleep(1.5)
     
-    if not match:
-        return UNKNOWN_RESPONSE
-
-    return generate_dynamic_response(query, match, "image")
+    return response
 
 @app.post("/analyze-symptoms", response_model=AnalysisResponse)
 async def analyze_symptoms(symptoms: str):
-    time.sleep(1.0)
+    with metrics.span("response_delay"):
+        await asyncio.sleep(1.0)
+
+    symptoms = normalize_input(symptoms)
+    kb = knowledge_base.current()
+    response = RESULT_CACHE.get("text", symptoms, kb.version)
+    if response is not None:
+        return response
     
-    match, score = find_best_match(symptoms)
+    match, score = await find_best_match_async(symptoms)
     
     if not match:
-        return UNKNOWN_RESPONSE
+        # Not cached: the web lookup may still be running in the background
+        # (its misses are cached by the web bridge)
+        response = UNKNOWN_RESPONSE
+    else:
+        with metrics.span("generate_response"):
+            response = generate_dynamic_response(symptoms, match, "text")
+        RESULT_CACHE.set("text", symptoms, kb.version, response)
+    return response
+
+class BatchSymptomsRequest(BaseModel):
+    symptoms: List[str] = Field(..., max_length=MAX_BATCH_SIZE)
+
+@app.post("/analyze-symptoms/batch", response_model=List[AnalysisResponse])
+async def analyze_symptoms_batch(request: BatchSymptomsRequest):
+    # The presentation delay is paid once per batch, not per item
+    with metrics.span("response_delay"):
+        await asyncio.sleep(1.0)
+
+    queries = [normalize_input(symptoms) for symptoms in request.symptoms]
+    kb = knowledge_base.current()
+    responses = [RESULT_CACHE.get("text", query, kb.version) for query in queries]
+    # Only inputs that missed the cache go through matching, each once
+    misses = list(dict.fromkeys(q for q, response in zip(queries, responses) if response is None))
+
+    if misses:
+        matches = await find_best_matches_batch(misses, kb)
+        computed = {}
+        with metrics.span("generate_response"):
+            for query, (match, score) in zip(misses, matches):
+                if not match:
+                    computed[query] = UNKNOWN_RESPONSE
+                    continue
+                computed[query] = generate_dynamic_response(query, match, "text")
+                RESULT_CACHE.set("text", query, kb.version, computed[query])
+        responses = [computed[q] if response is None else response for q, response in zip(queries, responses)]
 
-    return generate_dynamic_response(symptoms, match, "text")
+    return responses
+
+@app.post("/triage")
+async def triage_population(file: UploadFile = File(...), top: int = 100):
+    """
+    District screening run: scores every patient in an uploaded CSV or
+    Parquet file and returns level counts plus the top of the triage queue.
+    """
+    from . import risk_engine # Defers the NumPy import
+
+    def run():
+        file_format = "parquet" if file.filename.lower().endswith(".parquet") else "csv"
+        columns, patient_ids = risk_engine.load_population(file.file, file_format)
+        return risk_engine.triage_population(columns, patient_ids, top=top)
+
+    try:
+        with metrics.span("triage"):
+            return await asyncio.to_thread(run)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/analyze-report", response_model=AnalysisResponse)
 async def analyze_report(file: UploadFile = File(...)):
@@ -260,27 +632,27 @@ async def analyze_report(file: UploadFile = File(...)):
     # 1. Try to read and analyze content first (Most Accurate)
     print(f"Analyzing PDF content for '{filename}'...")
     try:
-        validation_text = await extract_text_from_pdf(file)
-        if validation_text:
-            text_match = find_condition_in_text(validation_text)
-            if text_match:
-                 match = text_match
-                 query = match["condition"] # Use found condition as query context
-                 print(f"Found condition in PDF text: {query}")
+        text_match = await find_condition_in_pdf(file)
+        if text_match:
+             match = text_match
+             query = match["condition"] # Use found condition as query context
+             print(f"Found condition in PDF text: {query}")
     except Exception as e:
         print(f"Error during PDF text analysis: {e}")
 
     # 2. Fallback to filename if content yield no match
     if not match:
         print("PDF content yield no match. Falling back to filename...")
-        match, score = find_best_match(query)
+        match, score = await find_best_match_async(query)
         
         if not match and "blood" in query:
-             match, _ = find_best_match("anemia")
+             match, _ = await find_best_match_async("anemia")
     
-    time.sleep(2)
+    with metrics.span("response_delay"):
+        await asyncio.sleep(2)
     
     if not match:
         return UNKNOWN_RESPONSE
 
-    return generate_dynamic_response(query, match, "report")
+    with metrics.span("generate_response"):
+        return generate_dynamic_response(query, match, "report")
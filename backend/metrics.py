@@ -0,0 +1,165 @@
+import asyncio
+import bisect
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Histogram bucket upper bounds, in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Event loop lag above this many seconds is reported as a blocking call
+LAG_THRESHOLD = 0.1
+LAG_INTERVAL = 0.05
+
+current_endpoint = ContextVar("current_endpoint", default="background")
+
+_lock = threading.Lock()
+_histograms = {}  # (metric name, labels tuple) -> Histogram
+_counters = Counter()  # (metric name, labels tuple) -> count
+_gauge_sources = {}  # metric prefix -> callable returning {name: number}
+_active_endpoints = Counter()
+_recent_endpoints = set()  # Endpoints that ran since the lag monitor last woke up
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram in the Prometheus layout.
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+def observe(name: str, value: float, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+        histogram.observe(value)
+
+
+def increment(name: str, amount: int = 1, **labels):
+    with _lock:
+        _counters[(name, tuple(sorted(labels.items())))] += amount
+
+
+def register_gauges(prefix: str, source):
+    """
+    Exposes the numeric values of source() as gauges named prefix_<key>.
+    """
+    _gauge_sources[prefix] = source
+
+
+@contextmanager
+def span(stage: str):
+    """
+    Times a block and records it under the current endpoint and stage.
+    Works in sync and async code, and in threads started with asyncio.to_thread.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(
+            "rural_ai_stage_seconds",
+            time.perf_counter() - start,
+            endpoint=current_endpoint.get(),
+            stage=stage,
+        )
+
+
+@contextmanager
+def track_request(endpoint: str):
+    """
+    Marks a request as in progress for the lag monitor and times it as a whole.
+    """
+    token = current_endpoint.set(endpoint)
+    _active_endpoints[endpoint] += 1
+    _recent_endpoints.add(endpoint)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe("rural_ai_request_seconds", time.perf_counter() - start, endpoint=endpoint)
+        _active_endpoints[endpoint] -= 1
+        if _active_endpoints[endpoint] <= 0:
+            del _active_endpoints[endpoint]
+        current_endpoint.reset(token)
+
+
+async def monitor_event_loop_lag(interval: float = LAG_INTERVAL, threshold: float = LAG_THRESHOLD):
+    """
+    Measures how late the event loop wakes up from a short sleep.
+    Large lag means something blocked the loop; the endpoints that ran
+    during that interval are reported as suspects.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        _recent_endpoints.clear()
+        _recent_endpoints.update(_active_endpoints)
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - start - interval)
+        observe("rural_ai_event_loop_lag_seconds", lag)
+        if lag > threshold:
+            suspects = sorted(_recent_endpoints) or ["unknown"]
+            for endpoint in suspects:
+                increment("rural_ai_event_loop_blocked_total", endpoint=endpoint)
+            print(f"WARNING: event loop blocked for {lag:.3f}s during {', '.join(suspects)}")
+
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape_label(v)}"' for k, v in pairs) + "}"
+
+
+def render_prometheus() -> str:
+    """
+    Renders every metric in the Prometheus text exposition format.
+    """
+    lines = []
+    with _lock:
+        histograms = sorted(_histograms.items())
+        counters = sorted(_counters.items())
+
+    seen = set()
+    for (name, labels), histogram in histograms:
+        if name not in seen:
+            seen.add(name)
+            lines.append(f"# TYPE {name} histogram")
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ("+Inf",), histogram.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {histogram.total}")
+        lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+    for (name, labels), count in counters:
+        if name not in seen:
+            seen.add(name)
+            lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name}{_format_labels(labels)} {count}")
+
+    for prefix, source in sorted(_gauge_sources.items()):
+        for key, value in sorted(source().items()):
+            if isinstance(value, (int, float)):
+                lines.append(f"# TYPE {prefix}_{key} gauge")
+                lines.append(f"{prefix}_{key} {value}")
+
+    return "\n".join(lines) + "\n"
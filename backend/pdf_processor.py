@@ -1,17 +1,175 @@
-import fitz  # PyMuPDF
+import asyncio
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import aclosing
+
 from fastapi import UploadFile
+from . import metrics
+
+# Limits for uploaded reports
+MAX_PDF_BYTES = int(os.environ.get("MAX_PDF_BYTES", 30 * 1024 * 1024))
+MAX_PDF_PAGES = int(os.environ.get("MAX_PDF_PAGES", 60))
+PAGES_PER_CHUNK = 4  # Pages parsed per process pool job
+READ_CHUNK_BYTES = 1024 * 1024
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", min(2, os.cpu_count() or 1)))
+
+_pool = None
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """
+    Returns the shared PDF parsing pool, starting it on first use.
+    """
+    global _pool
+    if _pool is None:
+        # spawn: forking a process that runs an event loop and threads is unsafe
+        _pool = ProcessPoolExecutor(
+            max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+
+def shutdown_pool(pool: ProcessPoolExecutor = None):
+    """
+    Stops the shared pool so the next get_pool() starts a new one. With
+    pool, only if that is still the shared one.
+    """
+    global _pool
+    if _pool is not None and pool in (None, _pool):
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _warm_worker():
+    import fitz  # PyMuPDF  # pylint: disable=unused-import
+
+    return os.getpid()
+
+
+async def warm_pool():
+    """
+    Starts every pool worker and imports PyMuPDF in it, so the first
+    report does not wait for that.
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_pool()
+    try:
+        await asyncio.gather(*(loop.run_in_executor(pool, _warm_worker) for _ in range(PDF_WORKERS)))
+    except Exception as e: # pylint: disable=broad-exception-caught
+        print(f"Could not warm up the PDF parsing pool: {e}")
+
+
+def extract_page_range(path: str, start: int, stop: int):
+    """
+    Runs in a pool worker. Returns (page_count, [text of pages start..stop-1]).
+    """
+    import fitz  # PyMuPDF, imported on first use to keep startup fast
+
+    with fitz.open(path) as doc:
+        stop = min(stop, doc.page_count)
+        return doc.page_count, [doc[i].get_text() for i in range(start, stop)]
+
+
+async def spool_upload(file: UploadFile, max_bytes: int = MAX_PDF_BYTES, digest=None) -> str:
+    """
+    Copies an upload to a temporary file in chunks and returns its path,
+    so pool workers can open it without the bytes being pickled to them.
+    If digest (a hashlib object) is given, it is fed the same chunks.
+    Raises ValueError if the upload is larger than max_bytes.
+    """
+    size = 0
+    handle = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
+    try:
+        with handle:
+            while chunk := await file.read(READ_CHUNK_BYTES):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ValueError(f"PDF upload exceeds the {max_bytes} byte limit")
+                handle.write(chunk)
+                if digest is not None:
+                    digest.update(chunk)
+    except BaseException:
+        os.unlink(handle.name)
+        raise
+    return handle.name
+
+
+async def iter_pdf_pages(file: UploadFile, max_pages: int = MAX_PDF_PAGES,
+                         max_bytes: int = MAX_PDF_BYTES):
+    """
+    Yields the text of each page in order, parsing a few pages at a time
+    in the process pool. The next chunk is parsed while the caller works
+    on the current one, and breaking out of the loop stops parsing.
+    """
+    with metrics.span("upload_read"):
+        path = await spool_upload(file, max_bytes)
+    async with aclosing(iter_spooled_pages(path, max_pages)) as pages:
+        async for text in pages:
+            yield text
+
+
+async def iter_spooled_pages(path: str, max_pages: int = MAX_PDF_PAGES):
+    """
+    iter_pdf_pages for an upload already spooled by spool_upload.
+    Removes the file when done.
+    """
+    loop = asyncio.get_running_loop()
+
+    async def extract(start):
+        # A worker that dies (a MuPDF crash, the OOM killer) breaks the
+        # whole pool; replace it and retry the chunk once
+        for attempt in range(2):
+            pool = get_pool()
+            try:
+                return await loop.run_in_executor(
+                    pool, extract_page_range, path, start, start + PAGES_PER_CHUNK
+                )
+            except BrokenProcessPool:
+                shutdown_pool(pool)
+                if attempt:
+                    raise
+                print("PDF parsing pool broke; restarting it.")
+
+    def submit(start):
+        return asyncio.ensure_future(extract(start))
+
+    chunk_start = 0
+    pending = submit(chunk_start)
+    try:
+        while pending is not None:
+            with metrics.span("pdf_extract"):
+                page_count, pages = await pending
+            last_page = min(page_count, max_pages)
+            next_start = chunk_start + PAGES_PER_CHUNK
+            pending = submit(next_start) if next_start < last_page else None
+            for text in pages[:last_page - chunk_start]:
+                yield text
+            chunk_start = next_start
+        if page_count > max_pages:
+            print(f"PDF has {page_count} pages; only the first {max_pages} were read.")
+    finally:
+        if pending is not None:
+            pending.cancel()
+        remove_spooled(path)
+
+
+def remove_spooled(path: str):
+    try:
+        os.unlink(path)
+    except OSError as e:
+        print(f"Could not remove temporary PDF {path}: {e}")
+
 
 async def extract_text_from_pdf(file: UploadFile) -> str:
     """
     Extracts text from an uploaded PDF file.
     """
     try:
-        content = await file.read()
-        doc = fitz.open(stream=content, filetype="pdf")
-        text = ""
-        for page in doc:
-            text += page.get_text()
-        return text
+        async with aclosing(iter_pdf_pages(file)) as pages:
+            return "".join([text async for text in pages])
     except Exception as e: # pylint: disable=broad-exception-caught
         print(f"Error extracting PDF text: {e}")
         return ""
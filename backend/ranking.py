@@ -0,0 +1,191 @@
+import math
+
+import numpy as np
+
+from .search_index import tokenize
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Term-frequency multiplier per entry field; the name says more than the prose
+FIELD_WEIGHTS = {"condition": 3, "keywords": 2, "explanation": 1}
+
+
+def entry_terms(entry: dict) -> dict:
+    """
+    Returns {term: weighted frequency} over an entry's indexed fields.
+    """
+    terms = {}
+    fields = {
+        "condition": entry["condition"],
+        "keywords": " ".join(entry.get("keywords", [])),
+        "explanation": entry.get("explanation", ""),
+    }
+    for field, text in fields.items():
+        weight = FIELD_WEIGHTS[field]
+        for token in tokenize(text):
+            terms[token] = terms.get(token, 0) + weight
+    return terms
+
+
+def term_weights(df: int, tfs, lengths, n: int, total_length: float):
+    """
+    Score contributions of one term to the documents with the given
+    weighted term frequencies and lengths, in a corpus of n documents.
+    """
+    n = max(n, 1)
+    avg_length = total_length / n or 1.0
+    idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+    tfs = np.asarray(tfs, dtype=np.float32)
+    norms = K1 * (1 - B + B * np.asarray(lengths, dtype=np.float32) / avg_length)
+    return (idf * tfs * (K1 + 1) / (tfs + norms)).astype(np.float32)
+
+
+class BM25Index:
+    """
+    BM25 ranking over condition names, keywords and explanations.
+    Document frequencies and length norms are computed up front, and each
+    term's postings store its final per-document score contribution, so
+    a query is a few vectorized additions.
+    """
+
+    def __init__(self, entries=()):
+        self.postings = {}  # term -> ([entry ids], [weighted tf])
+        self.doc_lengths = []
+        self.total_length = 0
+        self.impacts = {}  # term -> (entry id array, score contribution array)
+        for entry_id, entry in enumerate(entries):
+            self._add_postings(entry_id, entry)
+        doc_lengths = np.asarray(self.doc_lengths, dtype=np.float32)
+        for term in self.postings:
+            self._compute_impacts(term, doc_lengths)
+
+    @property
+    def size(self) -> int:
+        return len(self.doc_lengths)
+
+    def _add_postings(self, entry_id: int, entry: dict) -> dict:
+        terms = entry_terms(entry)
+        while len(self.doc_lengths) <= entry_id:
+            self.doc_lengths.append(0)
+        length = sum(terms.values())
+        self.doc_lengths[entry_id] = length
+        self.total_length += length
+        for term, tf in terms.items():
+            ids, tfs = self.postings.setdefault(term, ([], []))
+            ids.append(entry_id)
+            tfs.append(tf)
+        return terms
+
+    def _compute_impacts(self, term: str, doc_lengths=None):
+        """
+        A full build passes every document length as one array; single
+        updates only gather the lengths of the term's own documents.
+        """
+        ids, tfs = self.postings[term]
+        lengths = doc_lengths[ids] if doc_lengths is not None else [self.doc_lengths[i] for i in ids]
+        self.impacts[term] = (np.asarray(ids, dtype=np.int32),
+                              term_weights(len(ids), tfs, lengths, self.size, self.total_length))
+
+    def remove(self, entry_id: int, entry: dict):
+        terms = entry_terms(entry)
+        self.total_length -= self.doc_lengths[entry_id]
+        self.doc_lengths[entry_id] = 0
+        for term in terms:
+            ids, tfs = self.postings.get(term, ([], []))
+            if entry_id not in ids:
+                continue
+            position = ids.index(entry_id)
+            del ids[position]
+            del tfs[position]
+            if ids:
+                self._compute_impacts(term)
+            else:
+                del self.postings[term]
+                del self.impacts[term]
+
+    def copy(self):
+        """
+        Returns an independent copy. Impact arrays are never modified in
+        place, so they are shared rather than copied.
+        """
+        clone = BM25Index()
+        clone.postings = {term: (list(ids), list(tfs)) for term, (ids, tfs) in self.postings.items()}
+        clone.doc_lengths = list(self.doc_lengths)
+        clone.total_length = self.total_length
+        clone.impacts = dict(self.impacts)
+        return clone
+
+    def add(self, entry_id: int, entry: dict):
+        """
+        Indexes one more entry. Only the postings of its own terms are
+        re-weighted; the rest keep the corpus statistics of the last full
+        build, which drift negligibly for a handful of learned entries.
+        """
+        for term in self._add_postings(entry_id, entry):
+            self._compute_impacts(term)
+
+    def term_impacts(self, term: str) -> list:
+        """
+        The (entry id array, score contribution array) pairs of a term.
+        """
+        return [self.impacts[term]] if term in self.impacts else []
+
+    def search(self, tokens: list, k: int = 5, min_score: float = 0.0) -> list:
+        """
+        Returns up to k (entry_id, score) pairs, best first.
+        """
+        hits = [hit for term in set(tokens) for hit in self.term_impacts(term)]
+        if not hits:
+            return []
+
+        scores = np.zeros(self.size, dtype=np.float32)
+        for ids, contributions in hits:
+            scores[ids] += contributions
+
+        candidates = np.flatnonzero(scores > min_score)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        # Highest score first, earliest entry on ties
+        order = np.lexsort((candidates, -scores[candidates]))
+        return [(int(candidates[i]), float(scores[candidates[i]])) for i in order]
+
+
+class LayeredBM25(BM25Index):
+    """
+    BM25 over a frozen base index plus the entries appended since, which
+    are scored with the combined corpus statistics. Base impacts are kept
+    as they are, so layering costs only as much as the appended entries;
+    the drift is folded away by the next full build.
+    """
+
+    def __init__(self, base: BM25Index, entries, start: int):  # pylint: disable=super-init-not-called
+        self.base = base
+        self.postings = {}
+        self.doc_lengths = {}
+        self.total_length = base.total_length
+        self.impacts = {}
+        self.start = start
+        for entry_id, entry in enumerate(entries, start):
+            terms = entry_terms(entry)
+            length = sum(terms.values())
+            self.doc_lengths[entry_id] = length
+            self.total_length += length
+            for term, tf in terms.items():
+                ids, tfs = self.postings.setdefault(term, ([], []))
+                ids.append(entry_id)
+                tfs.append(tf)
+        self._size = start + len(self.doc_lengths)
+        for term, (ids, tfs) in self.postings.items():
+            df = len(ids) + len(base.postings.get(term, ((), ()))[0])
+            lengths = [self.doc_lengths[i] for i in ids]
+            self.impacts[term] = (np.asarray(ids, dtype=np.int32),
+                                  term_weights(df, tfs, lengths, self._size, self.total_length))
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def term_impacts(self, term: str) -> list:
+        return self.base.term_impacts(term) + ([self.impacts[term]] if term in self.impacts else [])
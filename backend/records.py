@@ -0,0 +1,118 @@
+import sys
+
+FIELDS = (
+    "condition",
+    "keywords",
+    "stage",
+    "explanation",
+    "treatment_guidance",
+    "medications",
+    "dos",
+    "donts",
+    "referral",
+)
+
+# Shared tuples, so the boilerplate lists repeated across entries
+# (medications, dos, donts) are stored once. Keywords are nearly unique per
+# entry, so they are not pooled. Capped, since pooled tuples live forever
+# and every reload would otherwise add whatever new lists it loaded.
+_tuple_pool = {}
+TUPLE_POOL_MAX = 1024
+
+
+def _intern_text(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _intern_tuple(values):
+    if values is None:
+        return None
+    return tuple(_intern_text(v) for v in values)
+
+
+def _intern_list(values):
+    values = _intern_tuple(values)
+    if values is None or len(_tuple_pool) >= TUPLE_POOL_MAX:
+        return _tuple_pool.get(values, values)
+    return _tuple_pool.setdefault(values, values)
+
+
+class ConditionRecord:
+    """
+    Compact, read-only knowledge base entry.
+    Boilerplate strings and lists (guidance, medications, dos, donts,
+    referral) are interned and shared between records, and the
+    lower-cased name is computed once at load time.
+    Supports the dict-style access the rest of the backend uses
+    (record["condition"], record.get("stage", default)).
+    """
+
+    __slots__ = FIELDS + ("name_lower",)
+
+    def __init__(self, data: dict):
+        set_field = object.__setattr__
+        set_field(self, "condition", data["condition"])
+        set_field(self, "keywords", _intern_tuple(data.get("keywords", [])))
+        set_field(self, "stage", _intern_text(data.get("stage")))
+        set_field(self, "explanation", data.get("explanation"))
+        set_field(self, "treatment_guidance", _intern_text(data.get("treatment_guidance")))
+        set_field(self, "medications", _intern_list(data.get("medications")))
+        set_field(self, "dos", _intern_list(data.get("dos")))
+        set_field(self, "donts", _intern_list(data.get("donts")))
+        set_field(self, "referral", _intern_text(data.get("referral")))
+        set_field(self, "name_lower", self.condition.lower())
+
+    @classmethod
+    def from_fields(cls, values):
+        """
+        Builds a record from values in FIELDS order, as given (no
+        interning), e.g. for entries read from a mapped index file.
+        """
+        record = cls.__new__(cls)
+        for field, value in zip(FIELDS, values):
+            object.__setattr__(record, field, value)
+        object.__setattr__(record, "name_lower", record.condition.lower())
+        return record
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ConditionRecord is read-only")
+
+    def __getitem__(self, key):
+        value = getattr(self, key, None) if key in FIELDS else None
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        value = getattr(self, key, None) if key in FIELDS else None
+        return default if value is None else value
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __eq__(self, other):
+        if isinstance(other, ConditionRecord):
+            return all(getattr(self, field) == getattr(other, field) for field in FIELDS)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"ConditionRecord({self.condition!r})"
+
+    def to_dict(self) -> dict:
+        """
+        Plain-dict form, in the medical_data.json layout.
+        """
+        data = {}
+        for field in FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                data[field] = list(value) if isinstance(value, tuple) else value
+        return data
+
+
+def to_record(entry):
+    if isinstance(entry, ConditionRecord):
+        return entry
+    return ConditionRecord(entry)
@@ -0,0 +1,61 @@
+import os
+import threading
+
+from .cache import MISSING, TTLCache
+
+RESULT_CACHE_TTL = float(os.environ.get("RESULT_CACHE_TTL", 3600))
+RESULT_CACHE_MAX_ENTRIES = int(os.environ.get("RESULT_CACHE_MAX_ENTRIES", 4096))
+# Approximate memory bound, measured as the size of the cached responses as JSON
+RESULT_CACHE_MAX_MB = float(os.environ.get("RESULT_CACHE_MAX_MB", 32))
+
+
+def normalize_input(text: str) -> str:
+    """
+    Lowercases and collapses whitespace, so trivially different spellings
+    of the same input share one cache entry.
+    """
+    return " ".join(text.lower().split())
+
+
+class ResultCache:
+    """
+    Caches finished analysis responses by input type and normalized input.
+    Every result belongs to the knowledge base version it was computed
+    from. The first lookup against a newer version empties the cache, and
+    results computed from an older one are never stored.
+    """
+
+    def __init__(self, max_entries: int = RESULT_CACHE_MAX_ENTRIES, ttl: float = RESULT_CACHE_TTL,
+                 max_bytes: int = int(RESULT_CACHE_MAX_MB * 1024 * 1024)):
+        self._cache = TTLCache(max_entries, ttl, max_bytes=max_bytes)
+        self._version = 0
+        self._lock = threading.Lock()
+        self.invalidations = 0
+
+    def _check_version(self, kb_version: int) -> bool:
+        """
+        Returns True if kb_version is the current one, clearing the cache
+        first if it is newer than anything seen so far.
+        """
+        with self._lock:
+            if kb_version > self._version:
+                if len(self._cache):
+                    self._cache.clear()
+                    self.invalidations += 1
+                self._version = kb_version
+            return kb_version == self._version
+
+    def get(self, input_type: str, text: str, kb_version: int):
+        if not self._check_version(kb_version):
+            return None
+        value = self._cache.get(f"{input_type}:{normalize_input(text)}")
+        return None if value is MISSING else value
+
+    def set(self, input_type: str, text: str, kb_version: int, response: dict):
+        if self._check_version(kb_version):
+            self._cache.set(f"{input_type}:{normalize_input(text)}", response)
+
+    def stats(self) -> dict:
+        stats = self._cache.stats()
+        stats.update(kb_version=self._version, invalidations=self.invalidations)
+        return stats
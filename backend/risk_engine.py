@@ -1,20 +1,67 @@
-def calculate_risk_score(image_confidence: float, symptom_severity: float, retrieved_severity: float) -> dict:
+import argparse
+import csv
+import io
+import os
+import sys
+
+import numpy as np
+
+RISK_LEVELS = ("Low", "Moderate", "High", "Emergency")
+RISK_COLUMNS = ("image_confidence", "symptom_severity", "retrieved_severity")
+
+
+def check_parameters(weights, thresholds):
+    """
+    Raises ValueError unless there is one finite weight per input and one
+    finite bound per level change, in ascending order.
+    """
+    if len(weights) != len(RISK_COLUMNS) or not np.isfinite(weights).all():
+        raise ValueError(f"Expected {len(RISK_COLUMNS)} finite risk weights, got {list(weights)}")
+    if (len(thresholds) != len(RISK_LEVELS) - 1 or not np.isfinite(thresholds).all()
+            or list(thresholds) != sorted(thresholds)):
+        raise ValueError(f"Expected {len(RISK_LEVELS) - 1} finite, ascending risk thresholds, "
+                         f"got {list(thresholds)}")
+
+
+def _env_floats(name: str, default: str) -> tuple:
+    try:
+        return tuple(float(value) for value in os.environ.get(name, default).split(","))
+    except ValueError as e:
+        raise ValueError(f"{name} must be comma-separated numbers: {e}") from e
+
+
+# Weight of each input in the risk score; inputs are normalized to 0-1
+RISK_WEIGHTS = _env_floats("RISK_WEIGHTS", "0.4,0.3,0.3")
+# Scores above each bound move one level up: Low -> Moderate -> High -> Emergency
+RISK_THRESHOLDS = _env_floats("RISK_THRESHOLDS", "0.25,0.5,0.75")
+check_parameters(RISK_WEIGHTS, RISK_THRESHOLDS)
+
+GUIDANCE = {
+    "Low": "Monitor symptoms. Apply over-the-counter cream if applicable.",
+    "Moderate": "Consult a local healthcare worker. Monitor for worsening symptoms.",
+    "High": "Urgent consultation required. Refer to district hospital.",
+    "Emergency": "IMMEDIATE REFERRAL REQUIRED. Transport patient to nearest emergency facility."
+}
+
+
+def calculate_risk_score(image_confidence: float, symptom_severity: float, retrieved_severity: float,
+                         weights=RISK_WEIGHTS, thresholds=RISK_THRESHOLDS) -> dict:
     """
     Calculate risk score based on weighted formula:
-    Risk = (0.4 * ImageScore) + (0.3 * SymptomScore) + (0.3 * RetrievedSeverity)
-    
+    Risk = (w1 * ImageScore) + (w2 * SymptomScore) + (w3 * RetrievedSeverity)
+
+    where (w1, w2, w3) are the given weights, by default RISK_WEIGHTS as
+    configured from the environment. The level is picked by comparing the
+    score with thresholds (RISK_THRESHOLDS by default).
     Scores are normalized between 0 and 1.
     """
-    risk_score = (0.4 * image_confidence) + (0.3 * symptom_severity) + (0.3 * retrieved_severity)
-    
-    risk_level = "Low"
-    if risk_score > 0.75:
-        risk_level = "Emergency"
-    elif risk_score > 0.5:
-        risk_level = "High"
-    elif risk_score > 0.25:
-        risk_level = "Moderate"
-        
+    risk_score = (weights[0] * image_confidence) + (weights[1] * symptom_severity) + (weights[2] * retrieved_severity)
+
+    risk_level = RISK_LEVELS[0]
+    for bound, level in zip(thresholds, RISK_LEVELS[1:]):
+        if risk_score > bound:
+            risk_level = level
+
     return {
         "score": round(risk_score, 2),
         "level": risk_level
@@ -22,10 +69,147 @@ def calculate_risk_score(image_confidence: float, symptom_severity: float, retri
 
 def get_treatment_guidance(risk_level: str, condition: str) -> str:
     # Placeholder logic
-    guidance = {
-        "Low": "Monitor symptoms. Apply over-the-counter cream if applicable.",
-        "Moderate": "Consult a local healthcare worker. Monitor for worsening symptoms.",
-        "High": "Urgent consultation required. Refer to district hospital.",
-        "Emergency": "IMMEDIATE REFERRAL REQUIRED. Transport patient to nearest emergency facility."
+    return GUIDANCE.get(risk_level, "Consult a specialist.")
+
+
+# --- Population triage ---
+def score_population(image_confidence, symptom_severity, retrieved_severity,
+                     weights=RISK_WEIGHTS, thresholds=RISK_THRESHOLDS):
+    """
+    Vectorized calculate_risk_score for many patients at once.
+    Returns (scores, level indexes into RISK_LEVELS) as NumPy arrays.
+    """
+    check_parameters(weights, thresholds)
+    inputs = np.stack([np.asarray(column, dtype=np.float64) for column in
+                       (image_confidence, symptom_severity, retrieved_severity)])
+    if not np.isfinite(inputs).all():
+        rows = np.flatnonzero(~np.isfinite(inputs).all(axis=0))
+        raise ValueError(f"Missing or invalid risk inputs in rows {rows[:10].tolist()}")
+
+    # Same operation order as calculate_risk_score, so both agree exactly at the bounds
+    scores = weights[0] * inputs[0] + weights[1] * inputs[1] + weights[2] * inputs[2]
+    # Number of bounds strictly below each score, matching the > comparisons above
+    levels = np.searchsorted(np.asarray(thresholds, dtype=np.float64), scores, side="left")
+    return scores, levels
+
+
+def triage_order(scores, levels):
+    """
+    Patient indexes, most urgent first: by level, then score, then input order.
+    """
+    return np.lexsort((np.arange(len(scores)), -scores, -levels))
+
+
+def triage_population(columns: dict, patient_ids=None, weights=RISK_WEIGHTS,
+                      thresholds=RISK_THRESHOLDS, top: int = None) -> dict:
+    """
+    Scores a population given as {column name: array} and returns the
+    per-level counts plus the triage queue (optionally only the top N).
+    """
+    if top is not None and top < 0:
+        raise ValueError(f"top must not be negative, got {top}")
+    missing = [name for name in RISK_COLUMNS if name not in columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    scores, levels = score_population(*(columns[name] for name in RISK_COLUMNS),
+                                      weights=weights, thresholds=thresholds)
+    if patient_ids is None:
+        patient_ids = np.arange(len(scores))
+
+    order = triage_order(scores, levels)
+    if top is not None:
+        order = order[:top]
+    counts = np.bincount(levels, minlength=len(RISK_LEVELS))
+
+    ids = np.asarray(patient_ids)[order].tolist()
+    queue_scores = np.round(scores[order], 2).tolist()
+    queue_levels = levels[order].tolist()
+    return {
+        "patients": len(scores),
+        "levels": {level: int(count) for level, count in zip(RISK_LEVELS, counts)},
+        "queue": [
+            {
+                "patient_id": patient_id,
+                "score": score,
+                "level": RISK_LEVELS[level],
+                "guidance": GUIDANCE[RISK_LEVELS[level]],
+            }
+            for patient_id, score, level in zip(ids, queue_scores, queue_levels)
+        ],
     }
-    return guidance.get(risk_level, "Consult a specialist.")
+
+
+def load_population(source, file_format: str = None):
+    """
+    Reads patient columns from a CSV or Parquet file (a path or a binary
+    file object). Returns ({column: array}, patient ids or None).
+    """
+    if file_format is None:
+        file_format = "parquet" if str(source).lower().endswith(".parquet") else "csv"
+
+    if file_format == "parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ValueError("Reading Parquet files requires pyarrow") from e
+        table = pq.read_table(source)
+        columns = {name: table.column(name).to_numpy() for name in table.column_names}
+    else:
+        if isinstance(source, str):
+            text = open(source, "r", newline="")
+        else:
+            text = io.TextIOWrapper(source, encoding="utf-8", newline="")
+        with text:
+            reader = csv.reader(text)
+            header = next(reader, None)
+            if not header or not any(name.strip() for name in header):
+                raise ValueError("File has no header row")
+            header = [name.strip() for name in header]
+            rows = list(reader)
+        columns = {}
+        for position, name in enumerate(header):
+            values = [row[position] if position < len(row) else "" for row in rows]
+            if name in RISK_COLUMNS:
+                columns[name] = np.array([float(v) if v.strip() else np.nan for v in values])
+            else:
+                columns[name] = np.array(values)
+
+    return columns, columns.get("patient_id")
+
+
+def write_queue(path: str, result: dict):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["patient_id", "score", "level", "guidance"])
+        writer.writeheader()
+        writer.writerows(result["queue"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Triage a patient population by risk score.")
+    parser.add_argument("path", help="CSV or Parquet file with columns " + ", ".join(RISK_COLUMNS)
+                        + " (and optionally patient_id)")
+    parser.add_argument("--weights", type=float, nargs=3, default=RISK_WEIGHTS)
+    parser.add_argument("--thresholds", type=float, nargs=3, default=RISK_THRESHOLDS,
+                        help="score bounds for Moderate, High and Emergency")
+    parser.add_argument("--top", type=int, default=20, help="patients to print")
+    parser.add_argument("--output", help="write the full triage queue to this CSV file")
+    args = parser.parse_args()
+
+    try:
+        columns, patient_ids = load_population(args.path)
+        result = triage_population(columns, patient_ids, args.weights, args.thresholds)
+    except (OSError, ValueError) as e:
+        print(f"Could not triage {args.path}: {e}")
+        sys.exit(1)
+
+    print(f"{result['patients']} patients: "
+          + ", ".join(f"{count} {level}" for level, count in result["levels"].items()))
+    for item in result["queue"][:args.top]:
+        print(f"{item['patient_id']:>12}  {item['score']:.2f}  {item['level']}")
+    if args.output:
+        write_queue(args.output, result)
+        print(f"Wrote triage queue to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import bisect
+import re
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Single-letter names are A-Z index headings scraped from the NHS site,
+# not real conditions, so they must never win a name match.
+MIN_NAME_LENGTH = 2
+
+
+def tokenize(text: str) -> list:
+    """
+    Splits text into lower-case alphanumeric tokens.
+    Punctuation is dropped, so "eyelids." and "eyelids" share a token.
+    """
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def ngrams(tokens: list, max_len: int) -> set:
+    """
+    Returns every contiguous token sequence of up to max_len tokens.
+    """
+    grams = set()
+    for size in range(1, max_len + 1):
+        for start in range(len(tokens) - size + 1):
+            grams.add(tuple(tokens[start:start + size]))
+    return grams
+
+
+def insert_posting(postings: dict, key, entry_id: int):
+    """
+    Adds entry_id to a posting list, keeping it sorted.
+    """
+    ids = postings.setdefault(key, [])
+    if not ids or ids[-1] <= entry_id:
+        ids.append(entry_id)
+    else:
+        bisect.insort(ids, entry_id)
+
+
+def remove_posting(postings: dict, key, entry_id: int):
+    ids = postings.get(key)
+    if ids and entry_id in ids:
+        ids.remove(entry_id)
+        if not ids:
+            del postings[key]
+
+
+class KeywordIndex:
+    """
+    Inverted index over condition names and keywords.
+    Maps each normalized keyword (a tuple of tokens) to the ids of the
+    conditions listing it, so a query only touches its own postings.
+    """
+
+    def __init__(self, entries=()):
+        self.keyword_postings = {}
+        self.name_postings = {}
+        self.max_keyword_len = 1
+        self.max_name_len = 1
+        for entry_id, entry in enumerate(entries):
+            self.add(entry_id, entry)
+
+    def add(self, entry_id: int, entry: dict):
+        name = tuple(tokenize(entry["condition"]))
+        if name and len(entry["condition"].strip()) >= MIN_NAME_LENGTH:
+            insert_posting(self.name_postings, name, entry_id)
+            self.max_name_len = max(self.max_name_len, len(name))
+
+        for keyword in entry["keywords"]:
+            key = tuple(tokenize(keyword))
+            if not key:
+                continue
+            insert_posting(self.keyword_postings, key, entry_id)
+            self.max_keyword_len = max(self.max_keyword_len, len(key))
+
+    def remove(self, entry_id: int, entry: dict):
+        remove_posting(self.name_postings, tuple(tokenize(entry["condition"])), entry_id)
+        for keyword in entry["keywords"]:
+            remove_posting(self.keyword_postings, tuple(tokenize(keyword)), entry_id)
+
+    def copy(self):
+        """
+        Returns an independent copy that can be updated without affecting this one.
+        """
+        clone = KeywordIndex()
+        clone.keyword_postings = {key: list(ids) for key, ids in self.keyword_postings.items()}
+        clone.name_postings = {key: list(ids) for key, ids in self.name_postings.items()}
+        clone.max_keyword_len = self.max_keyword_len
+        clone.max_name_len = self.max_name_len
+        return clone
+
+    def match_name(self, tokens: list):
+        """
+        Returns the id of the longest condition name contained in the
+        query as a whole-word phrase, or None.
+        """
+        best_id = None
+        best_len = 0
+        for gram in ngrams(tokens, self.max_name_len):
+            ids = self.name_postings.get(gram)
+            if not ids:
+                continue
+            if len(gram) > best_len or (len(gram) == best_len and ids[0] < best_id):
+                best_id = ids[0]
+                best_len = len(gram)
+        return best_id
+
+    def best_keyword_match(self, tokens: list):
+        """
+        Counts keyword hits per condition using only the query's postings.
+        Returns (entry_id, score); ties go to the earliest entry.
+        """
+        counts = {}
+        for gram in ngrams(tokens, self.max_keyword_len):
+            for entry_id in self.keyword_postings.get(gram, ()):
+                counts[entry_id] = counts.get(entry_id, 0) + 1
+
+        if not counts:
+            return None, 0
+        best_id = min(counts, key=lambda entry_id: (-counts[entry_id], entry_id))
+        return best_id, counts[best_id]
@@ -0,0 +1,123 @@
+"""
+Startup profiling for the API process.
+
+Heavy dependencies (BeautifulSoup, httpx, NumPy/SciPy, torch) are
+imported on first use or by warm_up() after the server is already
+accepting requests. PyMuPDF is only imported in the PDF parsing pool's
+worker processes. This module records how long each startup phase took
+and can profile import times from the command line:
+
+    python -m backend.startup --budget 2.0
+"""
+import argparse
+import asyncio
+import importlib
+import os
+import re
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+PROCESS_START = time.perf_counter()
+
+# Seconds from process start until the app should be ready to serve
+STARTUP_BUDGET = float(os.environ.get("STARTUP_BUDGET", "2.0"))
+
+# Imported in the background once the server is up, in this order
+WARM_UP_MODULES = ("httpx", "bs4", "numpy", "scipy.sparse")
+
+PHASES = {}  # phase name -> seconds
+WARM_UP = {}  # module name -> seconds
+
+
+@contextmanager
+def phase(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        PHASES[name] = round(time.perf_counter() - start, 4)
+
+
+def mark_ready():
+    """
+    Records the time to first request and warns if it exceeds the budget.
+    """
+    ready = round(time.perf_counter() - PROCESS_START, 4)
+    PHASES["time_to_ready"] = ready
+    if ready > STARTUP_BUDGET:
+        print(f"WARNING: startup took {ready:.2f}s, over the {STARTUP_BUDGET:.2f}s budget.")
+    else:
+        print(f"Startup finished in {ready:.2f}s.")
+
+
+def _import_quietly(name: str):
+    start = time.perf_counter()
+    try:
+        importlib.import_module(name)
+    except ImportError as e:
+        print(f"Warm-up skipped {name}: {e}")
+        return
+    WARM_UP[name] = round(time.perf_counter() - start, 4)
+
+
+async def warm_up(modules=WARM_UP_MODULES):
+    """
+    Imports heavy modules in a worker thread so the first request that
+    needs them does not pay the import cost.
+    """
+    for name in modules:
+        await asyncio.to_thread(_import_quietly, name)
+
+
+def report() -> dict:
+    return {
+        "budget_seconds": STARTUP_BUDGET,
+        "phases": dict(PHASES),
+        "warm_up": dict(WARM_UP),
+    }
+
+
+def profile_import(module: str) -> float:
+    """
+    Imports a module in a fresh interpreter and returns its cumulative
+    import time in seconds, as reported by -X importtime.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if result.returncode != 0:
+        return -1.0
+    # Lines look like "import time: self [us] | cumulative | imported package"
+    pattern = re.compile(r"import time:\s*\d+\s*\|\s*(\d+)\s*\|\s*" + re.escape(module) + r"\s*$")
+    for line in result.stderr.splitlines():
+        match = pattern.match(line)
+        if match:
+            return int(match.group(1)) / 1e6
+    return 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile API import and startup time.")
+    parser.add_argument("--budget", type=float, default=STARTUP_BUDGET,
+                        help="fail if importing backend.main takes longer (seconds)")
+    args = parser.parse_args()
+
+    print(f"{'module':<22} {'import (s)':>10}")
+    for module in ("backend.main",) + WARM_UP_MODULES + ("torch",):
+        seconds = profile_import(module)
+        shown = "missing" if seconds < 0 else f"{seconds:.3f}"
+        print(f"{module:<22} {shown:>10}")
+
+    main_import = profile_import("backend.main")
+    if main_import > args.budget:
+        print(f"backend.main import took {main_import:.3f}s, over the {args.budget:.2f}s budget.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import asyncio
+import json
+
+from .. import build_dataset
+from ..benchmarks.fake_nhs import FakeNHSConfig, start_fake_nhs
+
+
+def crawl(base_url, tmp_path, **kwargs):
+    asyncio.run(build_dataset.build_dataset(
+        base_url, str(tmp_path / "medical_data.json"), str(tmp_path / "crawl.jsonl"),
+        concurrency=4, rate=0, **kwargs))
+    with open(tmp_path / "medical_data.json") as f:
+        return json.load(f)
+
+
+def test_second_crawl_revalidates_with_conditional_gets(tmp_path):
+    config = FakeNHSConfig(latency_ms=0, jitter_ms=0, not_found_rate=0.2)
+    server, base_url = start_fake_nhs(config)
+    try:
+        first = crawl(base_url, tmp_path, target_count=10, fresh_for=0)
+        pages = config.stats["pages"]
+        assert len(first) == 10
+
+        # The target is already met, but stale pages must still be revalidated
+        second = crawl(base_url, tmp_path, target_count=10, fresh_for=0)
+        assert config.stats["not_modified"] == pages
+        assert config.stats["pages"] == pages
+        assert second == first
+    finally:
+        server.shutdown()
+
+
+def test_fresh_pages_are_reused_without_requests(tmp_path):
+    config = FakeNHSConfig(latency_ms=0, jitter_ms=0, not_found_rate=0.0)
+    server, base_url = start_fake_nhs(config)
+    try:
+        crawl(base_url, tmp_path, target_count=5, fresh_for=3600)
+        requests = config.stats["requests"]
+        crawl(base_url, tmp_path, target_count=5, fresh_for=3600)
+        assert config.stats["requests"] == requests + 1  # Only the A-Z index
+    finally:
+        server.shutdown()
+
+
+def test_server_errors_do_not_refresh_the_checkpoint(tmp_path):
+    checkpoint = {"url": "http://nhs.test/conditions/flu/", "name": "Flu", "etag": '"v1"',
+                  "last_modified": None, "fetched_at": 1.0, "entry": {"condition": "Flu"}}
+
+    async def scrape(status):
+        transport = build_dataset.httpx.MockTransport(lambda request: build_dataset.httpx.Response(status))
+        async with build_dataset.httpx.AsyncClient(transport=transport) as client:
+            return await build_dataset.scrape_condition_page(
+                client, build_dataset.HostRateLimiter(0), {"url": checkpoint["url"], "name": "Flu"}, checkpoint)
+
+    assert asyncio.run(scrape(503)) == (None, "failed")
+    assert asyncio.run(scrape(429)) == (None, "failed")
+    record, outcome = asyncio.run(scrape(304))
+    assert outcome == "not_modified" and record["entry"] == checkpoint["entry"] and record["fetched_at"] > 1.0
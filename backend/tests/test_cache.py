@@ -0,0 +1,80 @@
+import sqlite3
+import time
+
+from ..cache import MISSING, TTLCache
+
+
+def disk_rows(path):
+    with sqlite3.connect(path) as db:
+        return dict(db.execute("SELECT key, value FROM cache"))
+
+
+def test_set_does_not_write_until_flushed(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = TTLCache(path=path, flush_interval=3600)
+    cache.set("flu", {"condition": "Flu"})
+    assert cache.get("flu") == {"condition": "Flu"}
+    assert disk_rows(path) == {}
+
+    cache.flush()
+    assert disk_rows(path) == {"flu": '{"condition": "Flu"}'}
+    assert TTLCache(path=path, flush_interval=3600).get("flu") == {"condition": "Flu"}
+
+
+def test_background_writer_flushes_in_batches(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = TTLCache(path=path, flush_interval=0.05)
+    for i in range(20):
+        cache.set(f"key-{i}", i)
+    time.sleep(0.5)
+    assert len(disk_rows(path)) == 20
+    assert cache.stats()["pending_writes"] == 0
+
+
+def test_unflushed_entries_survive_memory_eviction(tmp_path):
+    cache = TTLCache(max_entries=1, path=str(tmp_path / "cache.db"), flush_interval=3600)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+
+
+def test_disk_store_is_bounded(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = TTLCache(max_entries=4, path=path, max_disk_entries=10, flush_interval=3600)
+    for i in range(25):
+        cache.set(f"key-{i}", i, ttl=1000 + i)
+    cache.set("expired", 0, ttl=-1)
+    cache.flush()
+    rows = disk_rows(path)
+    # The entries closest to expiry go first
+    assert sorted(rows) == sorted(f"key-{i}" for i in range(15, 25))
+    assert cache.stats()["disk_evictions"] == 15
+
+
+def test_expired_entries_are_deleted_from_disk(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = TTLCache(path=path, flush_interval=3600)
+    cache.set("flu", 1, ttl=0.01)
+    cache.flush()
+    time.sleep(0.02)
+    assert cache.get("flu") is MISSING
+    cache.flush()
+    assert disk_rows(path) == {}
+
+
+def test_disk_store_is_bounded_by_bytes(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = TTLCache(path=path, max_disk_bytes=100, flush_interval=3600)
+    for i in range(10):
+        cache.set(f"key-{i}", "x" * 18, ttl=1000 + i)  # 20 bytes as JSON
+    cache.set("key-9", "x" * 8, ttl=1009)  # Replacing an entry frees its old size
+    cache.flush()
+    assert sorted(disk_rows(path)) == sorted(f"key-{i}" for i in range(5, 10))
+    assert cache.stats()["disk_bytes"] == 90
+
+    # The running totals are picked up again from the file
+    reopened = TTLCache(path=path, max_disk_bytes=100, flush_interval=3600)
+    assert reopened.stats()["disk_entries"] == 5
+    assert reopened.stats()["disk_bytes"] == 90
+    assert reopened.get("key-9") == "x" * 8
+    assert reopened.stats()["disk_hits"] == 1
@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from ..inference_queue import InferenceQueue
+
+
+def run_queued(run_batch, items, **kwargs):
+    """
+    Submits every item concurrently and returns (outputs, queue).
+    """
+    async def main():
+        queue = InferenceQueue(run_batch, **kwargs)
+        queue.start()
+        try:
+            return await asyncio.gather(*(queue.submit(item) for item in items)), queue
+        finally:
+            await queue.stop()
+
+    return asyncio.run(main())
+
+
+def test_concurrent_submits_are_batched_and_routed_back():
+    batches = []
+
+    def double(batch):
+        batches.append(list(batch))
+        return [item * 2 for item in batch]
+
+    outputs, queue = run_queued(double, list(range(20)), max_batch_size=8, max_wait=0.05)
+    assert outputs == [item * 2 for item in range(20)]
+    assert max(len(batch) for batch in batches) > 1
+    assert all(len(batch) <= 8 for batch in batches)
+    assert queue.items == 20 and queue.batches == len(batches)
+
+
+def test_batch_errors_reach_every_caller():
+    def fail(batch):
+        raise ValueError("model exploded")
+
+    async def main():
+        queue = InferenceQueue(fail, max_wait=0.05)
+        queue.start()
+        try:
+            return await asyncio.gather(*(queue.submit(i) for i in range(3)), return_exceptions=True)
+        finally:
+            await queue.stop()
+
+    assert all(isinstance(result, ValueError) for result in asyncio.run(main()))
+
+
+def test_stand_in_cnn_predictions_are_routed_to_their_callers():
+    torch = pytest.importorskip("torch")
+    from .. import image_processor
+
+    image_processor.load_model(image_processor.STAND_IN_MODEL)
+    torch.manual_seed(1)
+    # Scaled inputs give each caller a clearly different prediction
+    tensors = [torch.rand(3, 224, 224) * (i + 1) for i in range(12)]
+    expected = [image_processor.predict_batch([tensor])[0] for tensor in tensors]
+
+    sizes = []
+
+    def predict(batch):
+        sizes.append(len(batch))
+        return image_processor.predict_batch(batch)
+
+    outputs, _ = run_queued(predict, tensors, max_batch_size=4, max_wait=0.05)
+    assert max(sizes) > 1
+    for output, solo in zip(outputs, expected):
+        assert output["condition"] == solo["condition"]
+        assert output["confidence"] == pytest.approx(solo["confidence"], abs=0.002)
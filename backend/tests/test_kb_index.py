@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+from .. import kb_index, knowledge_base
+from ..benchmarks.synthetic import (make_knowledge_base, make_misspelled_queries, make_queries,
+                                    make_report_text)
+from ..condition_scanner import ConditionScanner
+from ..fuzzy_index import FuzzyIndex
+from ..knowledge_store import KnowledgeStore
+from ..records import to_record
+from ..search_index import KeywordIndex, tokenize
+
+ENTRIES = make_knowledge_base(300)
+
+
+@pytest.fixture(scope="module")
+def indexes(tmp_path_factory):
+    """
+    (in-memory records, keyword index, scanner, fuzzy index) and the
+    same four mapped from an index file built from ENTRIES.
+    """
+    path = str(tmp_path_factory.mktemp("kb") / "medical_data.kbidx")
+    kb_index.write_index(ENTRIES, path)
+    index = kb_index.MappedIndex(path)
+    records = [to_record(entry) for entry in ENTRIES]
+    memory = (records, KeywordIndex(records), ConditionScanner(records), FuzzyIndex(records))
+    mapped = (index.entries(), index.keyword_index(), index.scanner(), index.fuzzy_index())
+    return memory, mapped
+
+
+def test_mapped_records_match_the_entries(indexes):
+    (records, *_), (mapped, *_) = indexes
+    assert len(mapped) == len(records)
+    for record, other in zip(records, mapped):
+        assert other.to_dict() == record.to_dict()
+
+
+def test_mapped_keyword_search_matches_the_in_memory_index(indexes):
+    (_, keywords, _, _), (_, mapped, _, _) = indexes
+    queries = make_queries(ENTRIES, 200) + [entry["condition"] for entry in ENTRIES[:50]]
+    for query in queries:
+        tokens = tokenize(query)
+        assert mapped.match_name(tokens) == keywords.match_name(tokens), query
+        assert mapped.best_keyword_match(tokens) == keywords.best_keyword_match(tokens), query
+
+
+def test_mapped_scanner_matches_the_in_memory_scanner(indexes):
+    (_, _, scanner, _), (_, _, mapped, _) = indexes
+    for seed in range(5):
+        text = " ".join(make_report_text(ENTRIES, 4, seed=seed))
+        assert mapped.count(text) == scanner.count(text)
+        assert mapped.best_match(text) == scanner.best_match(text)
+
+
+def test_mapped_fuzzy_search_matches_the_in_memory_index(indexes):
+    (_, _, _, fuzzy), (_, _, _, mapped) = indexes
+    for query in make_misspelled_queries(ENTRIES, 100):
+        assert mapped.search(query, k=3) == fuzzy.search(query, k=3), query
+
+
+def test_rebuild_bumps_the_generation_and_is_remapped(tmp_path):
+    data_path = tmp_path / "medical_data.json"
+    data_path.write_text(json.dumps(ENTRIES[:100]))
+    index_path = str(tmp_path / "medical_data.kbidx")
+    store = KnowledgeStore(str(data_path))
+
+    first = kb_index.write_index(store.load(), index_path)
+    snapshot = knowledge_base.load_index(index_path, store)
+    assert snapshot.generation == first == kb_index.read_generation(index_path)
+
+    data_path.write_text(json.dumps(ENTRIES[:120]))
+    second = kb_index.write_index(store.load(), index_path)
+    assert second == first + 1
+
+    remapped = knowledge_base.reload_index(index_path, store)
+    assert remapped.generation == second
+    assert len(remapped) == 120 and remapped.has_condition(ENTRIES[110]["condition"])
+    # Requests still holding the old snapshot keep reading the old file
+    assert len(snapshot) == 100 and not snapshot.has_condition(ENTRIES[110]["condition"])
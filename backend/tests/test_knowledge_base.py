@@ -0,0 +1,152 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from .. import kb_index, knowledge_base
+from ..benchmarks.synthetic import make_knowledge_base, make_misspelled_queries, make_queries, make_report_text
+from ..knowledge_store import KnowledgeStore
+from ..search_index import tokenize
+
+ENTRIES = [
+    {"condition": "Flu", "keywords": ["fever", "aching body"], "explanation": "A viral infection."},
+    {"condition": "Migraine", "keywords": ["headache", "aura"], "explanation": "Recurring headaches."},
+]
+
+
+def test_watcher_maps_an_index_built_after_startup(tmp_path):
+    data_path = tmp_path / "medical_data.json"
+    data_path.write_text(json.dumps(ENTRIES))
+    index_path = str(tmp_path / "medical_data.kbidx")
+    store = KnowledgeStore(str(data_path))
+
+    async def main():
+        watcher = asyncio.create_task(knowledge_base.watch(store, 0.02, index_path))
+        try:
+            await asyncio.sleep(0.1)
+            assert knowledge_base.current().generation is None  # Still serving the JSON file
+
+            generation = kb_index.write_index(ENTRIES, index_path)
+            for _ in range(100):
+                if knowledge_base.current().generation == generation:
+                    break
+                await asyncio.sleep(0.02)
+            return generation
+        finally:
+            watcher.cancel()
+
+    knowledge_base.load(store)
+    generation = asyncio.run(main())
+    snapshot = knowledge_base.current()
+    assert snapshot.generation == generation
+    assert snapshot.build_mode == "mapped"
+    assert snapshot.has_condition("Migraine")
+
+
+def make_store(tmp_path, entries):
+    data_path = tmp_path / "medical_data.json"
+    data_path.write_text(json.dumps(entries))
+    return KnowledgeStore(str(data_path))
+
+
+def wait_for_fold():
+    for _ in range(200):
+        if not knowledge_base._folding.is_set():
+            break
+        time.sleep(0.01)
+    with knowledge_base._write_lock:  # The fold publishes while holding it
+        pass
+
+
+@pytest.fixture
+def held_fold(monkeypatch):
+    """
+    Makes background folds wait until the returned event is set.
+    """
+    release = threading.Event()
+    build_full = knowledge_base._build_full
+
+    def slow_build_full(*args, **kwargs):
+        if threading.current_thread() is not threading.main_thread():
+            release.wait(5)
+        return build_full(*args, **kwargs)
+
+    monkeypatch.setattr(knowledge_base, "_build_full", slow_build_full)
+    yield release
+    release.set()
+    wait_for_fold()
+
+
+def assert_same_lookups(snapshot, entries):
+    """
+    Every index of snapshot answers like one built from scratch for entries.
+    """
+    fresh = knowledge_base.build_snapshot(entries)
+    assert [e.condition for e in snapshot.entries] == [e["condition"] for e in entries]
+    for query in make_queries(entries, 100) + [e["condition"] for e in entries[-40:]]:
+        tokens = tokenize(query)
+        assert snapshot.keyword_index.match_name(tokens) == fresh.keyword_index.match_name(tokens)
+        assert snapshot.keyword_index.best_keyword_match(tokens) == fresh.keyword_index.best_keyword_match(tokens)
+        if not snapshot.layered:  # Layered BM25 keeps the base impacts until folded
+            assert snapshot.bm25_index.search(tokens, k=3) == pytest.approx(fresh.bm25_index.search(tokens, k=3))
+    for query in make_misspelled_queries(entries, 50):
+        assert snapshot.fuzzy_index.search(query, k=3) == fresh.fuzzy_index.search(query, k=3)
+    for seed in range(3):
+        text = " ".join(make_report_text(entries, 3, seed=seed))
+        assert snapshot.scanner.count(text) == fresh.scanner.count(text)
+
+
+def test_learning_past_the_fold_threshold_matches_a_fresh_build(tmp_path, monkeypatch, held_fold):
+    monkeypatch.setattr(knowledge_base, "MAX_LAYERED_ENTRIES", 16)
+    entries = make_knowledge_base(240, seed=1)
+    store = make_store(tmp_path, entries[:200])
+    knowledge_base.load(store)
+    assert knowledge_base.current().bm25_index is not None  # Kept warm through the folds
+
+    for n, entry in enumerate(entries[200:216], 201):
+        assert knowledge_base.learn(store, entry)
+        if n == 210:
+            layered = knowledge_base.current()
+            assert layered.build_mode == "incremental" and layered.layered == 10
+            assert_same_lookups(layered, entries[:n])
+    assert knowledge_base._folding.is_set()
+
+    # Learned while the fold runs: layered again over the folded indexes
+    for entry in entries[216:224]:
+        assert knowledge_base.learn(store, entry)
+    held_fold.set()
+    wait_for_fold()
+    snapshot = knowledge_base.current()
+    assert len(snapshot.base) == 216 and snapshot.layered == 8
+    assert not knowledge_base.learn(store, entries[210])
+    assert_same_lookups(snapshot, entries[:224])
+
+    for entry in entries[224:232]:
+        assert knowledge_base.learn(store, entry)
+    wait_for_fold()
+    snapshot = knowledge_base.current()
+    assert snapshot.base is snapshot and len(snapshot) == 232
+    assert_same_lookups(snapshot, entries[:232])
+
+
+def test_reload_during_a_fold_wins(tmp_path, monkeypatch, held_fold):
+    monkeypatch.setattr(knowledge_base, "MAX_LAYERED_ENTRIES", 4)
+    entries = make_knowledge_base(60, seed=2)
+    store = make_store(tmp_path, entries[:50])
+    knowledge_base.load(store)
+    for entry in entries[50:54]:
+        assert knowledge_base.learn(store, entry)
+    assert knowledge_base._folding.is_set()
+
+    # The base file is edited meanwhile; the fold of the old base is dropped
+    edited = [dict(entry) for entry in entries[:50]]
+    edited[0]["keywords"] = edited[1]["keywords"]
+    (tmp_path / "medical_data.json").write_text(json.dumps(edited))
+    reloaded = knowledge_base.reload(store)
+    held_fold.set()
+    wait_for_fold()
+
+    assert knowledge_base.current() is reloaded
+    assert_same_lookups(reloaded, edited + entries[50:54])
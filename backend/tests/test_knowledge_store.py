@@ -0,0 +1,73 @@
+import json
+
+from ..knowledge_store import KnowledgeStore
+
+
+def entry(name):
+    return {"condition": name, "keywords": [name.lower()]}
+
+
+def make_store(tmp_path, base=(), **kwargs):
+    path = tmp_path / "medical_data.json"
+    path.write_text(json.dumps([entry(name) for name in base]))
+    return KnowledgeStore(str(path), **kwargs)
+
+
+def names(entries):
+    return [e["condition"] for e in entries]
+
+
+def test_torn_last_line_is_skipped_and_appends_start_a_fresh_line(tmp_path):
+    store = make_store(tmp_path, ["Flu"])
+    with open(store.journal_path, "w") as f:
+        f.write(json.dumps(entry("Measles")) + "\n" + json.dumps(entry("Mumps"))[:15])
+
+    assert names(store.load()) == ["Flu", "Measles"]
+    store.append(entry("Rubella"))
+    assert names(KnowledgeStore(store.path).load()) == ["Flu", "Measles", "Rubella"]
+
+
+def test_compaction_is_idempotent_after_a_crash_before_truncating(tmp_path):
+    def crash(entries):
+        raise OSError("disk full")
+
+    store = make_store(tmp_path, ["Flu"], compact_after=2, on_compact=crash)
+    store.append(entry("Measles"))
+    store.append(entry("Mumps"))  # Base file rewritten, journal left behind
+
+    with open(store.path) as f:
+        assert names(json.load(f)) == ["Flu", "Measles", "Mumps"]
+    assert len(store.load_journal()) == 2
+
+    reopened = KnowledgeStore(store.path)
+    assert names(reopened.load()) == ["Flu", "Measles", "Mumps"]
+    reopened.compact()
+    assert names(reopened.load()) == ["Flu", "Measles", "Mumps"]
+    assert reopened.load_journal() == []
+
+
+def test_failed_compaction_keeps_the_append_and_backs_off(tmp_path):
+    calls = []
+
+    def crash(entries):
+        calls.append(len(entries))
+        raise OSError("disk full")
+
+    store = make_store(tmp_path, compact_after=2, on_compact=crash)
+    for name in ("Measles", "Mumps", "Rubella"):
+        store.append(entry(name))
+    assert calls == [2]  # Not retried on every later append
+    assert names(KnowledgeStore(store.path).load()) == ["Measles", "Mumps", "Rubella"]
+
+
+def test_existing_journal_counts_towards_compaction(tmp_path):
+    store = make_store(tmp_path, ["Flu"], compact_after=3)
+    for name in ("Measles", "Mumps"):
+        store.append(entry(name))
+
+    # A new process that never loads the journal, as in mapped mode
+    reopened = KnowledgeStore(store.path, compact_after=3)
+    reopened.append(entry("Rubella"))
+    assert reopened.load_journal() == []
+    with open(store.path) as f:
+        assert names(json.load(f)) == ["Flu", "Measles", "Mumps", "Rubella"]
@@ -0,0 +1,47 @@
+import asyncio
+import os
+import signal
+
+import pytest
+
+from .. import pdf_processor
+
+fitz = pytest.importorskip("fitz")
+
+
+@pytest.fixture(autouse=True)
+def fresh_pool():
+    pdf_processor.shutdown_pool()
+    yield
+    pdf_processor.shutdown_pool()
+
+
+def write_report(path, pages):
+    with fitz.open() as doc:
+        for text in pages:
+            doc.new_page().insert_text((72, 72), text)
+        doc.save(path)
+    return str(path)
+
+
+def read_pages(path):
+    async def main():
+        return [text async for text in pdf_processor.iter_spooled_pages(path)]
+
+    return asyncio.run(main())
+
+
+def test_pages_are_read_in_order(tmp_path):
+    pages = [f"Page {i} mentions malaria" for i in range(pdf_processor.PAGES_PER_CHUNK * 2 + 1)]
+    texts = read_pages(write_report(tmp_path / "report.pdf", pages))
+    assert [text.strip() for text in texts] == pages
+
+
+def test_a_killed_worker_does_not_break_later_uploads(tmp_path):
+    assert read_pages(write_report(tmp_path / "first.pdf", ["Typhoid fever"]))
+
+    for pid in list(pdf_processor.get_pool()._processes):
+        os.kill(pid, signal.SIGKILL)
+
+    texts = read_pages(write_report(tmp_path / "second.pdf", ["Dengue fever"]))
+    assert [text.strip() for text in texts] == ["Dengue fever"]
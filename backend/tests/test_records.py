@@ -0,0 +1,16 @@
+from .. import records
+from ..records import ConditionRecord
+
+
+def test_boilerplate_lists_are_shared_but_the_pool_stays_bounded(monkeypatch):
+    monkeypatch.setattr(records, "_tuple_pool", {})
+    monkeypatch.setattr(records, "TUPLE_POOL_MAX", 4)
+
+    first = ConditionRecord({"condition": "Flu", "keywords": ["fever"], "dos": ["Rest"]})
+    second = ConditionRecord({"condition": "Cold", "keywords": ["sneezing"], "dos": ["Rest"]})
+    assert first.dos is second.dos
+
+    for i in range(20):
+        ConditionRecord({"condition": f"Condition {i}", "keywords": [f"word{i}"], "dos": [f"Do {i}"]})
+    assert len(records._tuple_pool) == 4
+    assert ConditionRecord({"condition": "Flu", "dos": ["Rest"]}).dos is first.dos
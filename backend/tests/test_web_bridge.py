@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+import pytest
+
+from .. import web_bridge
+from ..benchmarks.fake_nhs import FakeNHSConfig, start_fake_nhs
+
+
+@pytest.fixture(autouse=True)
+def fresh_bridge():
+    web_bridge.LOOKUP_CACHE.clear()
+    web_bridge._in_flight.clear()
+    yield
+    web_bridge.LOOKUP_CACHE.clear()
+
+
+@pytest.fixture
+def fake_nhs():
+    def start(**kwargs):
+        config = FakeNHSConfig(**{"latency_ms": 0, "jitter_ms": 0, "not_found_rate": 0.0, **kwargs})
+        server, base_url = start_fake_nhs(config)
+        servers.append(server)
+        return config, base_url
+
+    servers = []
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def lookup(*calls):
+    """
+    Runs the given (query, kwargs) lookups concurrently on one event loop.
+    """
+    async def main():
+        try:
+            return await asyncio.gather(*(web_bridge.get_live_nhs_data_async(query, **kwargs)
+                                          for query, kwargs in calls))
+        finally:
+            await web_bridge.close_client()
+
+    return asyncio.run(main())
+
+
+def test_concurrent_lookups_share_one_fetch(fake_nhs):
+    config, base_url = fake_nhs(latency_ms=200)
+    coalesced = web_bridge.cache_stats()["coalesced"]
+
+    results = lookup(*[("flu", {"base_url": base_url})] * 5)
+    assert config.stats["requests"] == 1
+    assert web_bridge.cache_stats()["coalesced"] == coalesced + 4
+    assert all(result == results[0] for result in results)
+    assert results[0]["condition"] == "Flu"
+
+
+def test_found_pages_are_served_from_the_cache(fake_nhs):
+    config, base_url = fake_nhs()
+    first, = lookup(("flu", {"base_url": base_url}))
+    second, = lookup(("flu", {"base_url": base_url}))
+    assert second == first
+    assert config.stats["requests"] == 1
+
+
+def test_missing_pages_are_negatively_cached(fake_nhs):
+    config, base_url = fake_nhs(not_found_rate=1.0)
+    assert lookup(("flu", {"base_url": base_url})) == [None]
+    assert web_bridge.LOOKUP_CACHE.get("flu") is None  # Cached as a miss, not MISSING
+    assert lookup(("flu", {"base_url": base_url})) == [None]
+    assert config.stats["requests"] == 1
+
+
+def test_lookups_give_up_at_the_deadline(fake_nhs):
+    config, base_url = fake_nhs(timeout_rate=1.0, hang_seconds=2)
+    started = time.perf_counter()
+    assert lookup(("flu", {"base_url": base_url, "deadline": 0.2})) == [None]
+    assert time.perf_counter() - started < 1.5
+    assert web_bridge.LOOKUP_CACHE.get("flu") is None
+    assert config.stats["timeouts"] == 1
+
+
+def test_unparseable_pages_are_negatively_cached(fake_nhs, monkeypatch):
+    def broken_parser(content, query):
+        raise AttributeError("unexpected page layout")
+
+    config, base_url = fake_nhs()
+    monkeypatch.setattr(web_bridge, "parse_condition_page", broken_parser)
+    assert lookup(("flu", {"base_url": base_url})) == [None]
+    assert web_bridge.LOOKUP_CACHE.get("flu") is None
+    assert config.stats["requests"] == 1
@@ -0,0 +1,78 @@
+import asyncio
+import hashlib
+import os
+
+from .cache import MISSING, TTLCache
+
+UPLOAD_CACHE_TTL = float(os.environ.get("UPLOAD_CACHE_TTL", 24 * 3600))
+UPLOAD_CACHE_MAX_ENTRIES = int(os.environ.get("UPLOAD_CACHE_MAX_ENTRIES", 1024))
+# Approximate memory bound, measured as the size of the cached values as JSON
+UPLOAD_CACHE_MAX_MB = float(os.environ.get("UPLOAD_CACHE_MAX_MB", 16))
+# SQLite file entries are also written to, shared by all workers and kept
+# across restarts; empty keeps the cache in memory only
+UPLOAD_CACHE_PATH = os.environ.get("UPLOAD_CACHE_PATH", "")
+UPLOAD_CACHE_DISK_MB = float(os.environ.get("UPLOAD_CACHE_DISK_MB", 256))
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def content_hash():
+    """
+    A new hash object for upload contents. BLAKE2b is faster than SHA-256
+    in hashlib and 128 bits is plenty to tell uploads apart.
+    """
+    return hashlib.blake2b(digest_size=16)
+
+
+def hash_file(fp) -> str:
+    """
+    Hashes a seekable file in chunks, without reading it into memory, and
+    rewinds it for the next reader. Runs in a worker thread.
+    """
+    digest = content_hash()
+    fp.seek(0)
+    while chunk := fp.read(HASH_CHUNK_BYTES):
+        digest.update(chunk)
+    fp.seek(0)
+    return digest.hexdigest()
+
+
+class UploadCache:
+    """
+    Content-addressed cache for what was derived from an uploaded file
+    (report text, image predictions), keyed by a hash of its bytes so a
+    retried upload hits whatever it is called.
+    Recent entries are kept in memory, bounded by count and size. With a
+    path, entries are also written behind to a SQLite file bounded by
+    max_disk_bytes and ten times max_entries (see TTLCache).
+    """
+
+    def __init__(self, max_entries: int = UPLOAD_CACHE_MAX_ENTRIES, ttl: float = UPLOAD_CACHE_TTL,
+                 max_bytes: int = int(UPLOAD_CACHE_MAX_MB * 1024 * 1024), path: str = UPLOAD_CACHE_PATH,
+                 max_disk_bytes: int = int(UPLOAD_CACHE_DISK_MB * 1024 * 1024)):
+        self._cache = TTLCache(max_entries, ttl, path=path or None, max_bytes=max_bytes,
+                               max_disk_bytes=max_disk_bytes)
+
+    def get(self, kind: str, digest: str):
+        """
+        Returns the cached value for an upload, or None.
+        """
+        value = self._cache.get(f"{kind}:{digest}")
+        return None if value is MISSING else value
+
+    async def get_async(self, kind: str, digest: str):
+        """
+        get() for async callers: a lookup that may read the file runs in a
+        worker thread.
+        """
+        if self._cache.path is None:
+            return self.get(kind, digest)
+        return await asyncio.to_thread(self.get, kind, digest)
+
+    def set(self, kind: str, digest: str, value):
+        self._cache.set(f"{kind}:{digest}", value)
+
+    def flush(self):
+        self._cache.flush()
+
+    def stats(self) -> dict:
+        return self._cache.stats()
@@ -1,74 +1,206 @@
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+import os
 
+from . import metrics
+from .cache import MISSING, TTLCache
 
-def get_live_nhs_data(query):
+# Overridable so the bridge can be pointed at a local stand-in server
+NHS_BASE_URL = os.environ.get("NHS_BASE_URL", "https://www.nhs.uk/conditions/")
+HEADERS = {'User-Agent': 'Mozilla/5.0'}
+REQUEST_TIMEOUT = 3  # seconds per URL candidate
+LOOKUP_DEADLINE = 5  # seconds for a whole async lookup
+
+# Lookup cache: pages found are kept for a day, misses (404s and
+# timeouts) for 10 minutes. Set NHS_CACHE_PATH to persist it on disk.
+CACHE_TTL = 24 * 3600
+NEGATIVE_CACHE_TTL = 600
+LOOKUP_CACHE = TTLCache(
+    max_entries=2048,
+    ttl=CACHE_TTL,
+    path=os.environ.get("NHS_CACHE_PATH"),
+)
+
+_client = None
+_in_flight = {}  # slug -> task, so identical lookups share one fetch
+_coalesced = 0
+
+
+def normalize_slug(query):
+    return "-".join(query.lower().split())
+
+
+def candidate_urls(query, base_url=None):
     """
-    Attempts to fetch data for a condition directly from NHS website in real-time.
-    Strategies:
+    Builds the list of NHS URLs to try for a query.
     1. Direct Slug Guess (e.g. "brain tumor" -> "brain-tumour")
-    2. (future) NHS Search
+    2. UK spelling variants of the slug
     """
-    print(f"DEBUG: Attempting live web fetch for: {query}")
-    
+    base_url = base_url or NHS_BASE_URL
+    if not base_url.endswith("/"):
+        base_url += "/"
+
     # Clean query to slug format
     # simplistic: spaces to hyphens
-    slug = query.lower().strip().replace(" ", "-")
-    
-    # List of URL candidates to try
-    urls_to_try = [
-        f"https://www.nhs.uk/conditions/{slug}/",
-        f"https://www.nhs.uk/conditions/{slug.replace('tumor', 'tumour')}/", # UK spelling
-        f"https://www.nhs.uk/conditions/{slug.replace('edema', 'oedema')}/",
-        f"https://www.nhs.uk/conditions/{slug.replace('anemia', 'anaemia')}/"
+    slug = normalize_slug(query)
+
+    slugs = [
+        slug,
+        slug.replace('tumor', 'tumour'), # UK spelling
+        slug.replace('edema', 'oedema'),
+        slug.replace('anemia', 'anaemia'),
     ]
-    
-    headers = {'User-Agent': 'Mozilla/5.0'}
-    
-    for url in urls_to_try:
-        try:
-            print(f"Checking URL: {url}")
-            response = requests.get(url, headers=headers, timeout=3)
-            
-            if response.status_code == 200:
-                print("Hit! Parsing content...")
-                soup = BeautifulSoup(response.content, 'html.parser')
-                main_content = soup.find('main')
-                
-                if not main_content: continue
-                
-                # Extract Title
-                title = soup.find('h1').get_text().strip() if soup.find('h1') else query.title()
-                
-                # Extract Description
-                explanation = "Information not available."
-                summary_section = main_content.find('section', class_='nhsuk-section') or main_content
-                
-                # Get first 2 substantial paragraphs
-                paragraphs = []
-                for p in summary_section.find_all('p'):
-                    text = p.get_text().strip()
-                    if len(text) > 40:
-                        paragraphs.append(text)
-                        if len(paragraphs) >= 2: break
-                
-                if paragraphs:
-                    explanation = " ".join(paragraphs)
-                
-                # Construct Response Object
-                return {
-                    "condition": title,
-                    "stage": "Live Web Result",
-                    "explanation": explanation,
-                    "treatment_guidance": "Please consult a GP for specific guidance on this condition.",
-                    "medications": ["Consult Doctor"],
-                    "dos": ["Monitor symptoms", "Consult NHS 111 if urgent"],
-                    "donts": ["Do not self-diagnose"],
-                    "referral": "Refer to GP.",
-                    "keywords": query.split()
-                }
-                
-        except Exception as e:
-            print(f"Error fetching {url}: {e}")
-            
-    return None
+    # Most queries have no spelling variant, so drop repeated URLs
+    return [f"{base_url}{s}/" for s in dict.fromkeys(slugs)]
+
+
+def parse_condition_page(content, query):
+    """
+    Turns an NHS condition page into a knowledge base entry.
+    Returns None if the page has no main content.
+    """
+    from bs4 import BeautifulSoup # Deferred: slow to import, rarely needed
+
+    soup = BeautifulSoup(content, 'html.parser')
+    main_content = soup.find('main')
+
+    if not main_content: return None
+
+    # Extract Title
+    title = soup.find('h1').get_text().strip() if soup.find('h1') else query.title()
+
+    # Extract Description
+    explanation = "Information not available."
+    summary_section = main_content.find('section', class_='nhsuk-section') or main_content
+
+    # Get first 2 substantial paragraphs
+    paragraphs = []
+    for p in summary_section.find_all('p'):
+        text = p.get_text().strip()
+        if len(text) > 40:
+            paragraphs.append(text)
+            if len(paragraphs) >= 2: break
+
+    if paragraphs:
+        explanation = " ".join(paragraphs)
+
+    # Construct Response Object
+    return {
+        "condition": title,
+        "stage": "Live Web Result",
+        "explanation": explanation,
+        "treatment_guidance": "Please consult a GP for specific guidance on this condition.",
+        "medications": ["Consult Doctor"],
+        "dos": ["Monitor symptoms", "Consult NHS 111 if urgent"],
+        "donts": ["Do not self-diagnose"],
+        "referral": "Refer to GP.",
+        "keywords": query.split()
+    }
+
+
+def get_client():
+    """
+    Returns the shared pooled HTTP client, creating it on first use.
+    """
+    import httpx
+
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            headers=HEADERS,
+            timeout=REQUEST_TIMEOUT,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        )
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _timed_parse(content, query):
+    with metrics.span("web_parse"):
+        return parse_condition_page(content, query)
+
+
+async def _probe(client, url, query):
+    import httpx
+
+    try:
+        with metrics.span("web_fetch"):
+            response = await client.get(url)
+        if response.status_code != 200:
+            return None
+        print(f"Hit! Parsing content from {url}...")
+        # HTML parsing is CPU-bound; keep it off the event loop
+        return await asyncio.to_thread(_timed_parse, response.content, query)
+    except httpx.HTTPError as e:
+        print(f"Error fetching {url}: {e}")
+        return None
+    except Exception as e: # pylint: disable=broad-exception-caught
+        # A page we cannot parse is a miss like any other, and cached as one
+        print(f"Error parsing {url}: {e}")
+        return None
+
+
+async def get_live_nhs_data_async(query, deadline=LOOKUP_DEADLINE, base_url=None):
+    """
+    Fetches a condition page from the NHS website in real time, without
+    blocking the event loop. Answers from LOOKUP_CACHE when possible.
+    Concurrent lookups for the same slug wait on a single fetch instead of
+    each hitting the NHS site.
+    """
+    global _coalesced
+    key = normalize_slug(query)
+    cached = LOOKUP_CACHE.get(key)
+    if cached is not MISSING:
+        return cached
+
+    task = _in_flight.get(key)
+    if task is None:
+        task = asyncio.create_task(_fetch_async(query, deadline, base_url))
+        _in_flight[key] = task
+        task.add_done_callback(lambda _: _in_flight.pop(key, None))
+    else:
+        _coalesced += 1
+
+    # Shield the shared fetch so one caller disconnecting does not cancel it for the rest
+    result = await asyncio.shield(task)
+    return result
+
+
+async def _fetch_async(query, deadline, base_url):
+    """
+    Probes every URL candidate concurrently over the shared client, returns
+    the first successful hit and cancels the rest. Gives up after deadline
+    seconds. The outcome is cached either way.
+    """
+    print(f"DEBUG: Attempting async live web fetch for: {query}")
+    client = get_client()
+    tasks = [
+        asyncio.create_task(_probe(client, url, query))
+        for url in candidate_urls(query, base_url)
+    ]
+    result = None
+    try:
+        for next_done in asyncio.as_completed(tasks, timeout=deadline):
+            result = await next_done
+            if result:
+                break
+    except asyncio.TimeoutError:
+        print(f"Live web fetch for '{query}' exceeded {deadline}s deadline.")
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    LOOKUP_CACHE.set(normalize_slug(query), result, None if result else NEGATIVE_CACHE_TTL)
+    return result
+
+
+def cache_stats():
+    stats = LOOKUP_CACHE.stats()
+    stats["in_flight"] = len(_in_flight)
+    stats["coalesced"] = _coalesced
+    return stats